@@ -1,4 +1,276 @@
+"""
+Razorpay gateway.
+
+Every outbound Razorpay call goes through `get_razorpay_client()`, which
+returns a RazorpayGateway around the SDK client. The gateway adds:
+
+- one pooled, keep-alive requests.Session per process (RAZORPAY_POOL_SIZE);
+- a (connect, read) timeout on every call;
+- bounded retries with full jitter: reads retry on timeouts, connection
+  errors and 5xx, while writes only retry when the connection was never
+  made, so a subscription is never created twice;
+- a circuit breaker: after RAZORPAY_BREAKER_THRESHOLD failed calls in a
+  row, calls fail fast with GatewayUnavailable for
+  RAZORPAY_BREAKER_COOLDOWN seconds, then one trial call decides whether
+  to close it again;
+- per-operation latency stats (`gateway.metrics.snapshot()`).
+
+The gateway exposes the SDK's attribute shape (`.subscription.create`,
+`.utility.verify_webhook_signature`, `.auth`), so tests can swap in any
+in-process fake with the same shape using `override_razorpay_client`.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
 import razorpay
+import requests
 from django.conf import settings
+from razorpay.errors import BadRequestError, GatewayError, ServerError
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+# SDK methods that can be repeated safely after an ambiguous failure.
+IDEMPOTENT_METHODS = ("all", "fetch")
+
+
+class GatewayUnavailable(Exception):
+    """Razorpay is failing and the circuit breaker is refusing calls."""
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default timeout to every request."""
+
+    def __init__(self, timeout, pool_size):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker; closed -> open -> half-open -> closed."""
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.opened_at is not None and self.clock() - self.opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.cooldown or self._trial_running:
+                return False
+            # Half-open: let exactly one call through to probe.
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning("Razorpay circuit opened after %d failures", self.failures)
+                self.opened_at = self.clock()
+
+
+class GatewayMetrics:
+    """Per-operation call counts and latency, for this process."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds=None, outcome="ok"):
+        with self._lock:
+            stats = self._stats.setdefault(operation, {
+                "calls": 0, "errors": 0, "retries": 0, "rejected": 0,
+                "total_ms": 0.0, "max_ms": 0.0,
+            })
+            if outcome == "rejected":
+                stats["rejected"] += 1
+                return
+            if outcome == "retry":
+                stats["retries"] += 1
+                return
+            stats["calls"] += 1
+            if outcome == "error":
+                stats["errors"] += 1
+            ms = seconds * 1000
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                operation: {
+                    **stats,
+                    "avg_ms": stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0,
+                }
+                for operation, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Timeouts, connection failures and Razorpay 5xx: worth retrying later.
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, ServerError, GatewayError)
+
+# What callers should report as "payment gateway unavailable".
+UNAVAILABLE_ERRORS = (GatewayUnavailable,) + TRANSIENT_ERRORS
+
+
+def _is_safe_to_retry(exc, idempotent) -> bool:
+    if idempotent:
+        return isinstance(exc, TRANSIENT_ERRORS)
+    # The request never reached Razorpay.
+    return isinstance(exc, requests.ConnectTimeout)
+
+
+class _GatewayResource:
+    def __init__(self, gateway, name, resource):
+        self._gateway = gateway
+        self._name = name
+        self._resource = resource
+
+    def __getattr__(self, method):
+        func = getattr(self._resource, method)
+        operation = f"{self._name}.{method}"
+        idempotent = method in IDEMPOTENT_METHODS
+
+        def call(*args, **kwargs):
+            return self._gateway.call(operation, func, args, kwargs, idempotent)
+        return call
+
+
+class RazorpayGateway:
+    def __init__(
+        self,
+        client,
+        max_retries=2,
+        backoff=0.2,
+        backoff_max=2.0,
+        breaker=None,
+        metrics=None,
+        sleep=time.sleep,
+    ):
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(threshold=5, cooldown=30)
+        self.metrics = metrics or GatewayMetrics()
+        self.sleep = sleep
+
+    @property
+    def auth(self):
+        return self.client.auth
+
+    @property
+    def utility(self):
+        # Signature checks are local HMACs; nothing to guard.
+        return self.client.utility
+
+    def __getattr__(self, name):
+        return _GatewayResource(self, name, getattr(self.client, name))
+
+    def call(self, operation, func, args=(), kwargs=None, idempotent=False):
+        kwargs = kwargs or {}
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.record(operation, outcome="rejected")
+                raise GatewayUnavailable(f"Razorpay circuit open; {operation} not attempted.")
+
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as exc:
+                elapsed = time.perf_counter() - started
+                self.metrics.record(operation, elapsed, "error")
+                if isinstance(exc, BadRequestError):
+                    # Razorpay is up and rejected the request; retrying won't help.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not _is_safe_to_retry(exc, idempotent):
+                    raise
+            else:
+                self.breaker.record_success()
+                self.metrics.record(operation, time.perf_counter() - started)
+                return result
+
+            attempt += 1
+            self.metrics.record(operation, outcome="retry")
+            # Full jitter keeps retrying workers from moving in lockstep.
+            self.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+
+
+def build_razorpay_client():
+    session = TimeoutSession(
+        timeout=(settings.RAZORPAY_CONNECT_TIMEOUT, settings.RAZORPAY_READ_TIMEOUT),
+        pool_size=settings.RAZORPAY_POOL_SIZE,
+    )
+    client = razorpay.Client(session=session, auth=(settings.TEST_API_KEY_ID, settings.TEST_KEY_SECRET))
+    return RazorpayGateway(
+        client,
+        max_retries=settings.RAZORPAY_MAX_RETRIES,
+        backoff=settings.RAZORPAY_RETRY_BACKOFF,
+        backoff_max=settings.RAZORPAY_RETRY_BACKOFF_MAX,
+        breaker=CircuitBreaker(
+            threshold=settings.RAZORPAY_BREAKER_THRESHOLD,
+            cooldown=settings.RAZORPAY_BREAKER_COOLDOWN,
+        ),
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_razorpay_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_razorpay_client()
+    return _client
+
 
-razorpay_client = razorpay.Client(auth=(settings.TEST_API_KEY_ID, settings.TEST_KEY_SECRET))
+@contextmanager
+def override_razorpay_client(client):
+    """Route every Razorpay call to `client` (e.g. an in-process fake) for the block."""
+    global _client
+    previous = _client
+    _client = client
+    try:
+        yield client
+    finally:
+        _client = previous
@@ -0,0 +1,222 @@
+"""
+Per-user subscription entitlement, cached so that HasActiveSubscription does
+not hit the database on every API call.
+
+An entry holds the computed access window and is only valid until the next
+moment the answer could flip on its own (`current_start` in the future, or
+`current_end`), capped at ENTITLEMENT_CACHE_TTL. Anything that changes an
+OwnerSubscription must call `invalidate_entitlement(owner_id)`.
+
+Entries live in the shared cache when REDIS_URL configures one (or wherever
+ENTITLEMENT_CACHE_ALIAS points), so an invalidation from the webhook worker
+is seen by every worker immediately. Without one they live in an in-process
+LRU and other workers only catch up after the TTL; process_webhooks warns
+about that.
+
+Access tokens also carry the entitlement as claims (see users.tokens), so the
+permission check normally never touches this cache at all. When a webhook
+takes access away, `revoke_entitlement_claims` marks every claim issued
+before that moment as untrusted.
+"""
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import OwnerSubscription
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    status: str | None
+    current_start: datetime | None
+    current_end: datetime | None
+    expires_at: datetime
+
+    def has_access(self, now=None) -> bool:
+        now = now or timezone.now()
+
+        if self.status == OwnerSubscription.Status.ACTIVE:
+            if self.current_start and self.current_start > now:
+                return False
+            if self.current_end and self.current_end <= now:
+                return False
+            return True
+
+        # Cancelled or halted subscriptions keep access for the paid period.
+        if self.status in (OwnerSubscription.Status.CANCELLED, OwnerSubscription.Status.HALTED):
+            return bool(self.current_end and self.current_end > now)
+
+        return False
+
+    @property
+    def access_until(self) -> datetime | None:
+        """End of the paid period for a granted entitlement (None = open-ended)."""
+        return self.current_end if self.has_access() else None
+
+
+class _LocalLRUCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if timezone.now() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _DjangoCache:
+    def __init__(self, alias):
+        self.alias = alias
+
+    def get(self, key):
+        item = caches[self.alias].get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if timezone.now() >= expires_at:
+            return None
+        return value
+
+    def set(self, key, value, expires_at):
+        timeout = math.ceil((expires_at - timezone.now()).total_seconds())
+        if timeout > 0:
+            caches[self.alias].set(key, (value, expires_at), timeout)
+
+    def delete(self, key):
+        caches[self.alias].delete(key)
+
+    def clear(self):
+        # Shared backends may hold other data; entries expire on their own.
+        pass
+
+
+_local_cache = _LocalLRUCache(settings.ENTITLEMENT_CACHE_MAX_ENTRIES)
+
+
+def _backend():
+    alias = settings.ENTITLEMENT_CACHE_ALIAS
+    if alias:
+        return _DjangoCache(alias)
+    return _local_cache
+
+
+def _cache_key(user_id):
+    return f"entitlement:{user_id}"
+
+
+def _revoked_key(user_id):
+    return f"entitlement-revoked:{user_id}"
+
+
+def compute_entitlement(user_id, now=None) -> Entitlement:
+    now = now or timezone.now()
+    sub = (
+        OwnerSubscription.objects
+        .filter(owner_id=user_id)
+        .values("status", "current_start", "current_end")
+        .first()
+    ) or {"status": None, "current_start": None, "current_end": None}
+
+    expires_at = now + timedelta(seconds=settings.ENTITLEMENT_CACHE_TTL)
+    for boundary in (sub["current_start"], sub["current_end"]):
+        if boundary and now < boundary < expires_at:
+            expires_at = boundary
+
+    return Entitlement(expires_at=expires_at, **sub)
+
+
+def get_entitlement(user_id) -> Entitlement:
+    backend = _backend()
+    key = _cache_key(user_id)
+
+    entitlement = backend.get(key)
+    if entitlement is None:
+        entitlement = compute_entitlement(user_id)
+        backend.set(key, entitlement, entitlement.expires_at)
+    return entitlement
+
+
+def invalidate_entitlement(user_id):
+    _backend().delete(_cache_key(user_id))
+
+
+def clear_entitlement_cache():
+    _backend().clear()
+
+
+def entitlement_claims(user_id) -> dict:
+    """Claims embedded in access tokens by users.tokens.EntitlementRefreshToken."""
+    entitlement = get_entitlement(user_id)
+    access_until = entitlement.access_until
+    return {
+        "sub_status": entitlement.status if entitlement.has_access() else None,
+        "access_until": int(access_until.timestamp()) if access_until else None,
+        "ent_at": int(timezone.now().timestamp()),
+    }
+
+
+def claims_grant_access(payload, user_id) -> bool:
+    """
+    True when the token's entitlement claims alone authorize the request.
+
+    Only positive claims are trusted: a token minted before the owner paid
+    must not lock them out, so anything else falls back to get_entitlement().
+    Claims within ENTITLEMENT_CLAIM_LEEWAY of `access_until` are re-checked
+    too, since a renewal may be sitting in the database already.
+    """
+    if not payload.get("sub_status") or "ent_at" not in payload:
+        return False
+
+    now = timezone.now()
+    access_until = payload.get("access_until")
+    if access_until is not None:
+        remaining = access_until - now.timestamp()
+        if remaining <= settings.ENTITLEMENT_CLAIM_LEEWAY.total_seconds():
+            return False
+
+    revoked_at = _backend().get(_revoked_key(user_id))
+    if revoked_at is not None and payload["ent_at"] <= revoked_at:
+        return False
+
+    return True
+
+
+def revoke_entitlement_claims(user_id):
+    """
+    Stop trusting entitlement claims in tokens already issued to this user.
+
+    The marker only has to outlive the access tokens it covers.
+    """
+    now = timezone.now()
+    expires_at = now + settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]
+    _backend().set(_revoked_key(user_id), int(now.timestamp()), expires_at)
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from billing.processing import process_pending_events
+from gym.caching import is_shared_cache
+
+
+class Command(BaseCommand):
+    help = "Apply pending Razorpay webhook events from the inbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--interval", type=float, default=2.0,
+                            help="Seconds to sleep when the inbox is empty.")
+        parser.add_argument("--once", action="store_true",
+                            help="Drain the inbox once and exit (for cron).")
+
+    def handle(self, *args, **options):
+        # Invalidations and claim revocations are written from this process;
+        # the web workers only see them through a shared cache. Without one
+        # they still catch up once their cached entries expire.
+        if not is_shared_cache(settings.ENTITLEMENT_CACHE_ALIAS):
+            self.stderr.write(self.style.WARNING(
+                "ENTITLEMENT_CACHE_ALIAS is not a shared cache (set REDIS_URL): web workers "
+                f"may serve old subscription states for up to {settings.ENTITLEMENT_CACHE_TTL}s."
+            ))
+
+        batch_size = options["batch_size"]
+
+        while True:
+            handled = process_pending_events(batch_size=batch_size)
+            if handled:
+                self.stdout.write(f"Processed {handled} webhook event(s).")
+                continue
+
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+def delete_duplicate_payment_events(apps, schema_editor):
+    """Redeliveries used to be logged again; keep the first copy of each."""
+    PaymentEvent = apps.get_model("billing", "PaymentEvent")
+    seen = set()
+    duplicates = []
+    events = (
+        PaymentEvent.objects
+        .filter(razorpay_payment_id__isnull=False)
+        .order_by("id")
+        .values_list("id", "razorpay_payment_id", "event_type")
+    )
+    for pk, payment_id, event_type in events.iterator():
+        if (payment_id, event_type) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add((payment_id, event_type))
+    PaymentEvent.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentevent',
+            name='razorpay_event_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='event_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(delete_duplicate_payment_events, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='paymentevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('razorpay_payment_id__isnull', False)), fields=('razorpay_payment_id', 'event_type'), name='uniq_paymentevent_payment_event'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_webhook_dedup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ownersubscription',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
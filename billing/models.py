@@ -55,6 +55,10 @@ class OwnerSubscription(models.Model):
 
     trial_end = models.DateTimeField(null=True, blank=True)
 
+    # Razorpay `created_at` of the newest webhook applied; older events
+    # that arrive later are logged but never overwrite this state.
+    last_event_at = models.DateTimeField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -79,6 +83,8 @@ class PaymentEvent(models.Model):
         related_name="events"
     )
     event_type = models.CharField(max_length=100) 
+    # Razorpay's X-Razorpay-Event-Id; the same event is never applied twice.
+    razorpay_event_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     razorpay_payment_id = models.CharField(max_length=100, null=True, blank=True)
     razorpay_invoice_id = models.CharField(max_length=100, null=True, blank=True)
     amount_inr = models.PositiveIntegerField(null=True, blank=True)
@@ -86,6 +92,53 @@ class PaymentEvent(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Fallback dedup key for deliveries that carry no event id.
+            models.UniqueConstraint(
+                fields=["razorpay_payment_id", "event_type"],
+                condition=models.Q(razorpay_payment_id__isnull=False),
+                name="uniq_paymentevent_payment_event",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.event_type} - {self.subscription.owner.username}"
 
+
+class WebhookEvent(models.Model):
+    """
+    Durable inbox of verified Razorpay webhooks.
+
+    The webhook view only verifies and stores the event; `process_webhooks`
+    applies it to the subscription later (see billing/processing.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        FAILED = "failed", "Failed"
+
+    event_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    event_type = models.CharField(max_length=100)
+    razorpay_subscription_id = models.CharField(max_length=100, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+
+    # Razorpay's own `created_at`; processing follows this, not arrival order.
+    event_created_at = models.DateTimeField(null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "event_created_at", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} [{self.status}]"
+
@@ -0,0 +1,232 @@
+"""
+Background processing of the Razorpay webhook inbox.
+
+RazorpayWebhookView stores each verified event as a pending WebhookEvent and
+ACKs straight away; `process_pending_events` (driven by the
+`process_webhooks` management command) applies them to OwnerSubscription in
+Razorpay's event order.
+
+The billing period normally comes from the subscription entity in the event
+payload. Razorpay is only asked (once per subscription per batch) when an
+event's entity lacks the period, or the event carries no timestamp to order
+it by. An event older than the last one applied to the subscription is
+logged but does not change its state.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .client import get_razorpay_client
+from .entitlements import invalidate_entitlement, revoke_entitlement_claims
+from .models import OwnerSubscription, PaymentEvent, WebhookEvent
+
+
+MAX_ATTEMPTS = 5
+
+ACTIVATING_EVENTS = (
+    "subscription.activated",
+    "subscription.charged",
+    "subscription.resumed",
+)
+
+# Events after which tokens minted earlier may over-state access.
+ACCESS_REVOKING_EVENTS = (
+    "subscription.halted",
+    "subscription.paused",
+    "subscription.cancelled",
+    "subscription.completed",
+)
+
+# Events that carry the subscription's current billing period.
+PERIOD_EVENTS = ACTIVATING_EVENTS + ("subscription.cancelled",)
+
+PERIOD_FIELDS = ("current_start", "current_end")
+
+
+def _ts_to_dt(ts: int | None):
+    if not ts:
+        return None
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+def _entity(payload, name):
+    return payload.get("payload", {}).get(name, {}).get("entity", {})
+
+
+def _payload_period(payload):
+    """The payload's subscription entity, if it carries the billing period."""
+    entity = _entity(payload, "subscription")
+    if all(field in entity for field in PERIOD_FIELDS):
+        return entity
+    return None
+
+
+def _is_stale(sub, event_at) -> bool:
+    return bool(event_at and sub.last_event_at and event_at < sub.last_event_at)
+
+
+def _needs_fetch(sub, event) -> bool:
+    if event.event_type not in PERIOD_EVENTS or _is_stale(sub, event.event_created_at):
+        return False
+    return event.event_created_at is None or _payload_period(event.payload) is None
+
+
+def _fetch_subscriptions(client, subscription_ids):
+    fetched = {}
+    for subscription_id in subscription_ids:
+        try:
+            fetched[subscription_id] = client.subscription.fetch(subscription_id)
+        except Exception:
+            # Don't fail the event if Razorpay fetch fails; status still applies.
+            fetched[subscription_id] = None
+    return fetched
+
+
+def _apply_period(sub, rp):
+    if not rp:
+        return
+    sub.current_start = _ts_to_dt(rp.get("current_start"))
+    sub.current_end = _ts_to_dt(rp.get("current_end"))
+
+    rp_customer_id = rp.get("customer_id")
+    if rp_customer_id and not sub.razorpay_customer_id:
+        sub.razorpay_customer_id = rp_customer_id
+
+
+def apply_event(sub, event, payload, rp=None, event_id=None, event_at=None) -> bool:
+    """
+    Log `event` against `sub` and apply its status transition.
+
+    The period comes from `rp` (a fetched subscription) or else the payload's
+    own entity. Returns False without touching `sub` when PaymentEvent's
+    unique keys say this event was already applied. An event older than
+    `sub.last_event_at` is logged only.
+    """
+    payment_entity = _entity(payload, "payment")
+    invoice_entity = _entity(payload, "invoice")
+
+    amount_paise = payment_entity.get("amount")
+    amount_inr = (amount_paise // 100) if isinstance(amount_paise, int) else None
+
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                subscription=sub,
+                event_type=event,
+                razorpay_event_id=event_id,
+                razorpay_payment_id=payment_entity.get("id"),
+                razorpay_invoice_id=invoice_entity.get("id"),
+                amount_inr=amount_inr,
+                payload=payload,
+            )
+    except IntegrityError:
+        return False
+
+    if _is_stale(sub, event_at):
+        return True
+
+    rp = rp or _payload_period(payload)
+    if event_at:
+        sub.last_event_at = event_at
+
+    if event in ACTIVATING_EVENTS:
+        sub.status = OwnerSubscription.Status.ACTIVE
+        _apply_period(sub, rp)
+        sub.save()
+
+    elif event in ("subscription.halted", "subscription.paused"):
+        sub.status = OwnerSubscription.Status.HALTED
+        sub.save(update_fields=["status", "last_event_at", "updated_at"])
+
+    elif event == "subscription.cancelled":
+        sub.status = OwnerSubscription.Status.CANCELLED
+        _apply_period(sub, rp)
+        sub.save()
+
+    elif event == "subscription.completed":
+        sub.status = OwnerSubscription.Status.EXPIRED
+        sub.save(update_fields=["status", "last_event_at", "updated_at"])
+
+    # After commit, or a concurrent request could re-cache the old state.
+    owner_id = sub.owner_id
+    transaction.on_commit(lambda: invalidate_entitlement(owner_id))
+    if event in ACCESS_REVOKING_EVENTS:
+        transaction.on_commit(lambda: revoke_entitlement_claims(owner_id))
+
+    return True
+
+
+def _mark_failed(event, exc):
+    event.attempts += 1
+    event.last_error = repr(exc)
+    if event.attempts >= MAX_ATTEMPTS:
+        event.status = WebhookEvent.Status.FAILED
+    event.save(update_fields=["attempts", "last_error", "status"])
+
+
+def process_pending_events(client=None, batch_size=100) -> int:
+    """
+    Apply up to `batch_size` pending inbox events; returns how many were handled.
+
+    Razorpay is asked for missing periods before anything is locked. The
+    batch is then claimed with SKIP LOCKED where the database supports it,
+    so several consumers can run side by side, and applied in one short
+    transaction. Events another consumer took in the meantime are skipped.
+    """
+    if client is None:
+        client = get_razorpay_client()
+
+    pending = list(
+        WebhookEvent.objects
+        .filter(status=WebhookEvent.Status.PENDING)
+        .order_by("event_created_at", "id")[:batch_size]
+    )
+    if not pending:
+        return 0
+
+    subscription_ids = {e.razorpay_subscription_id for e in pending if e.razorpay_subscription_id}
+    subs = OwnerSubscription.objects.in_bulk(subscription_ids, field_name="razorpay_subscription_id")
+
+    needs_fetch = {
+        e.id for e in pending
+        if e.razorpay_subscription_id in subs and _needs_fetch(subs[e.razorpay_subscription_id], e)
+    }
+    fetched = _fetch_subscriptions(
+        client, {e.razorpay_subscription_id for e in pending if e.id in needs_fetch},
+    )
+
+    with transaction.atomic():
+        events = list(
+            WebhookEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(id__in=[e.id for e in pending], status=WebhookEvent.Status.PENDING)
+            .order_by("event_created_at", "id")
+        )
+        # Re-read: another consumer may have applied newer events meanwhile.
+        subs = OwnerSubscription.objects.in_bulk(subscription_ids, field_name="razorpay_subscription_id")
+
+        for event in events:
+            sub = subs.get(event.razorpay_subscription_id)
+            if sub is not None:
+                try:
+                    with transaction.atomic():
+                        apply_event(
+                            sub,
+                            event.event_type,
+                            event.payload,
+                            rp=fetched.get(event.razorpay_subscription_id) if event.id in needs_fetch else None,
+                            event_id=event.event_id,
+                            event_at=event.event_created_at,
+                        )
+                except Exception as exc:
+                    sub.refresh_from_db()
+                    _mark_failed(event, exc)
+                    continue
+
+            # Unknown subscriptions are dropped, same as the old inline handler.
+            event.status = WebhookEvent.Status.PROCESSED
+            event.processed_at = timezone.now()
+            event.save(update_fields=["status", "processed_at"])
+
+    return len(events)
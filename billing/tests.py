@@ -1,3 +1,403 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+import requests
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from razorpay.errors import BadRequestError
+from rest_framework.test import APIClient
+
+from users.models import User
+from .client import CircuitBreaker, GatewayUnavailable, RazorpayGateway, override_razorpay_client
+from .entitlements import clear_entitlement_cache, get_entitlement, invalidate_entitlement
+from .models import SaaSPlan, OwnerSubscription, PaymentEvent, WebhookEvent
+from .processing import process_pending_events
+
+
+WEBHOOK_SECRET = "test-webhook-secret"
+
+
+class StubSubscriptions:
+    def __init__(self, entities):
+        self.entities = entities
+        self.fetched = []
+        self.created = []
+
+    def fetch(self, subscription_id):
+        self.fetched.append(subscription_id)
+        return self.entities[subscription_id]
+
+    def create(self, data):
+        self.created.append(data)
+        return {"id": f"sub_{len(self.created)}", "status": "created"}
+
+
+class StubRazorpayClient:
+    auth = ("rzp_test_key", "secret")
+
+    def __init__(self, entities=None):
+        self.subscription = StubSubscriptions(entities or {})
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class RazorpayWebhookPipelineTests(TestCase):
+    def setUp(self):
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        self.sub = OwnerSubscription.objects.create(
+            owner=self.user,
+            plan=plan,
+            razorpay_subscription_id="sub_123",
+        )
+
+    def post_event(self, event, created_at, event_id=None, **entities):
+        body = json.dumps({
+            "event": event,
+            "created_at": created_at,
+            "payload": {name: {"entity": entity} for name, entity in entities.items()},
+        })
+        signature = hmac.new(WEBHOOK_SECRET.encode(), body.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse("razorpay-webhook"),
+            data=body,
+            content_type="application/json",
+            HTTP_X_RAZORPAY_SIGNATURE=signature,
+            **({"HTTP_X_RAZORPAY_EVENT_ID": event_id} if event_id else {}),
+        )
+
+    def test_webhook_only_stores_event(self):
+        response = self.post_event("subscription.activated", 1700000000, subscription={"id": "sub_123"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING).count(), 1)
+        self.assertFalse(PaymentEvent.objects.exists())
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.status, OwnerSubscription.Status.CREATED)
+
+    def test_rejects_bad_signature(self):
+        response = self.client.post(
+            reverse("razorpay-webhook"),
+            data="{}",
+            content_type="application/json",
+            HTTP_X_RAZORPAY_SIGNATURE="nope",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_worker_applies_events_in_order_with_one_fetch(self):
+        start = timezone.now().replace(microsecond=0)
+        end = start + timedelta(days=30)
+        client = StubRazorpayClient({
+            "sub_123": {
+                "current_start": int(start.timestamp()),
+                "current_end": int(end.timestamp()),
+                "customer_id": "cust_1",
+            },
+        })
+
+        # Delivered out of order: the cancel happened after the charge.
+        self.post_event("subscription.cancelled", 1700000200, subscription={"id": "sub_123"})
+        self.post_event(
+            "subscription.charged", 1700000100,
+            subscription={"id": "sub_123"},
+            payment={"id": "pay_1", "amount": 49900},
+        )
+
+        self.assertEqual(process_pending_events(client=client), 2)
+
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.status, OwnerSubscription.Status.CANCELLED)
+        self.assertEqual(self.sub.current_end, end)
+        self.assertEqual(self.sub.razorpay_customer_id, "cust_1")
+        self.assertEqual(client.subscription.fetched, ["sub_123"])
+        self.assertEqual(
+            list(PaymentEvent.objects.order_by("id").values_list("event_type", "amount_inr")),
+            [("subscription.charged", 499), ("subscription.cancelled", None)],
+        )
+        self.assertFalse(WebhookEvent.objects.exclude(status=WebhookEvent.Status.PROCESSED).exists())
+        self.assertEqual(process_pending_events(client=client), 0)
+
+    def test_unknown_subscription_is_dropped(self):
+        self.post_event("subscription.activated", 1700000000, subscription={"id": "sub_other"})
+
+        self.assertEqual(process_pending_events(client=StubRazorpayClient()), 1)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_redelivered_event_is_stored_once(self):
+        for _ in range(3):
+            response = self.post_event("subscription.activated", 1700000000, event_id="evt_1", subscription={"id": "sub_123"})
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(WebhookEvent.objects.filter(event_id="evt_1").count(), 1)
+
+    def test_duplicate_payment_is_applied_once(self):
+        client = StubRazorpayClient({"sub_123": {}})
+        for _ in range(2):
+            self.post_event(
+                "subscription.charged", 1700000000,
+                subscription={"id": "sub_123"},
+                payment={"id": "pay_1", "amount": 49900},
+            )
+
+        self.assertEqual(process_pending_events(client=client), 2)
+        self.assertEqual(PaymentEvent.objects.filter(razorpay_payment_id="pay_1").count(), 1)
+
+    def test_period_comes_from_payload_without_fetch(self):
+        start = timezone.now().replace(microsecond=0)
+        end = start + timedelta(days=30)
+        client = StubRazorpayClient()
+
+        self.post_event(
+            "subscription.activated", 1700000000,
+            subscription={
+                "id": "sub_123",
+                "current_start": int(start.timestamp()),
+                "current_end": int(end.timestamp()),
+                "customer_id": "cust_1",
+            },
+        )
+
+        self.assertEqual(process_pending_events(client=client), 1)
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.status, OwnerSubscription.Status.ACTIVE)
+        self.assertEqual((self.sub.current_start, self.sub.current_end), (start, end))
+        self.assertEqual(self.sub.razorpay_customer_id, "cust_1")
+        self.assertEqual(client.subscription.fetched, [])
+
+    def test_razorpay_is_called_before_events_are_locked(self):
+        client = StubRazorpayClient({"sub_123": {"current_start": 1700000000, "current_end": 1702592000}})
+        depth = []
+        fetch = client.subscription.fetch
+        client.subscription.fetch = lambda subscription_id: depth.append(len(connection.atomic_blocks)) or fetch(subscription_id)
+
+        self.post_event("subscription.activated", 1700000000, subscription={"id": "sub_123"})
+        outer = len(connection.atomic_blocks)
+
+        self.assertEqual(process_pending_events(client=client), 1)
+        self.assertEqual(depth, [outer])
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.current_end.timestamp(), 1702592000)
+
+    def test_older_event_in_later_batch_does_not_overwrite_state(self):
+        period = {"id": "sub_123", "current_start": 1700000000, "current_end": 1702592000}
+        client = StubRazorpayClient()
+
+        self.post_event("subscription.cancelled", 1700000200, subscription=period)
+        self.assertEqual(process_pending_events(client=client), 1)
+
+        self.post_event("subscription.charged", 1700000100, subscription=period, payment={"id": "pay_1", "amount": 49900})
+        self.assertEqual(process_pending_events(client=client), 1)
+
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.status, OwnerSubscription.Status.CANCELLED)
+        self.assertEqual(self.sub.last_event_at.timestamp(), 1700000200)
+        self.assertTrue(PaymentEvent.objects.filter(razorpay_payment_id="pay_1").exists())
+        self.assertEqual(client.subscription.fetched, [])
+
+
+class EntitlementCacheTests(TestCase):
+    def setUp(self):
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        self.sub = OwnerSubscription.objects.create(
+            owner=self.user,
+            plan=plan,
+            status=OwnerSubscription.Status.ACTIVE,
+            razorpay_subscription_id="sub_123",
+        )
+
+    def test_entitlement_is_read_once_then_cached(self):
+        self.assertTrue(get_entitlement(self.user.id).has_access())
+
+        with self.assertNumQueries(0):
+            self.assertTrue(get_entitlement(self.user.id).has_access())
+
+    def test_invalidation_drops_the_cached_answer(self):
+        get_entitlement(self.user.id)
+        OwnerSubscription.objects.filter(pk=self.sub.pk).update(status=OwnerSubscription.Status.EXPIRED)
+
+        self.assertTrue(get_entitlement(self.user.id).has_access())
+        invalidate_entitlement(self.user.id)
+        self.assertFalse(get_entitlement(self.user.id).has_access())
+
+    def test_entry_expires_at_period_end_within_ttl(self):
+        self.sub.current_end = timezone.now() + timedelta(seconds=30)
+        self.sub.save()
+
+        entitlement = get_entitlement(self.user.id)
+
+        self.assertEqual(entitlement.expires_at, self.sub.current_end)
+
+    def test_worker_invalidates_after_commit(self):
+        self.assertTrue(get_entitlement(self.user.id).has_access())
+        WebhookEvent.objects.create(
+            event_type="subscription.completed",
+            event_created_at=timezone.now(),
+            razorpay_subscription_id="sub_123",
+            payload={
+                "event": "subscription.completed",
+                "payload": {"subscription": {"entity": {"id": "sub_123"}}},
+            },
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_events(client=StubRazorpayClient({"sub_123": {}}))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(get_entitlement(self.user.id).has_access())
+        self.assertEqual(len(queries), 1)
+
+
+class ProcessWebhooksCommandTests(TestCase):
+    def test_warns_but_runs_without_a_shared_entitlement_cache(self):
+        WebhookEvent.objects.create(
+            event_id="evt_1",
+            event_type="subscription.halted",
+            razorpay_subscription_id="sub_unknown",
+            payload={"event": "subscription.halted"},
+        )
+        for alias in (None, "default"):
+            with self.subTest(alias=alias), override_settings(ENTITLEMENT_CACHE_ALIAS=alias):
+                stderr = StringIO()
+                with override_razorpay_client(StubRazorpayClient({})):
+                    call_command("process_webhooks", "--once", stdout=StringIO(), stderr=stderr)
+
+                self.assertIn("ENTITLEMENT_CACHE_ALIAS", stderr.getvalue())
+        self.assertFalse(WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING).exists())
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_cache"},
+        },
+        ENTITLEMENT_CACHE_ALIAS="shared",
+    )
+    def test_runs_with_a_shared_entitlement_cache(self):
+        call_command("createcachetable", "test_cache")
+
+        call_command("process_webhooks", "--once", stdout=StringIO())
+
+
+class FlakySubscriptions:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def fetch(self, subscription_id):
+        return self._next()
+
+    def create(self, data):
+        return self._next()
+
+
+class FlakyClient:
+    auth = ("rzp_test_key", "secret")
+
+    def __init__(self, *outcomes):
+        self.subscription = FlakySubscriptions(*outcomes)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RazorpayGatewayTests(SimpleTestCase):
+    def gateway(self, client, threshold=3, clock=None):
+        return RazorpayGateway(
+            client,
+            max_retries=2,
+            breaker=CircuitBreaker(threshold=threshold, cooldown=30, clock=clock or FakeClock()),
+            sleep=lambda seconds: None,
+        )
+
+    def test_fetch_retries_transient_errors(self):
+        client = FlakyClient(requests.ReadTimeout(), requests.ConnectionError(), {"id": "sub_1"})
+        gateway = self.gateway(client)
+
+        self.assertEqual(gateway.subscription.fetch("sub_1"), {"id": "sub_1"})
+        self.assertEqual(client.subscription.calls, 3)
+        stats = gateway.metrics.snapshot()["subscription.fetch"]
+        self.assertEqual((stats["calls"], stats["errors"], stats["retries"]), (3, 2, 2))
+
+    def test_create_is_not_retried_after_the_request_was_sent(self):
+        client = FlakyClient(requests.ReadTimeout(), {"id": "sub_1"})
+
+        with self.assertRaises(requests.ReadTimeout):
+            self.gateway(client).subscription.create({})
+        self.assertEqual(client.subscription.calls, 1)
+
+    def test_create_retries_connect_timeout(self):
+        client = FlakyClient(requests.ConnectTimeout(), {"id": "sub_1"})
+
+        self.assertEqual(self.gateway(client).subscription.create({}), {"id": "sub_1"})
+
+    def test_breaker_fails_fast_then_probes(self):
+        clock = FakeClock()
+        client = FlakyClient(*[requests.ConnectionError()] * 3, {"id": "sub_1"})
+        gateway = self.gateway(client, clock=clock)
+
+        with self.assertRaises(requests.ConnectionError):
+            gateway.subscription.fetch("sub_1")
+        with self.assertRaises(GatewayUnavailable):
+            gateway.subscription.fetch("sub_1")
+        self.assertEqual(client.subscription.calls, 3)
+
+        clock.now += 31
+        self.assertEqual(gateway.subscription.fetch("sub_1"), {"id": "sub_1"})
+        self.assertFalse(gateway.breaker.is_open)
+
+    def test_bad_request_is_not_retried_or_counted_against_razorpay(self):
+        client = FlakyClient(BadRequestError("bad plan"))
+        gateway = self.gateway(client, threshold=1)
+
+        with self.assertRaises(BadRequestError):
+            gateway.subscription.fetch("sub_1")
+        self.assertEqual(client.subscription.calls, 1)
+        self.assertFalse(gateway.breaker.is_open)
+
+
+class SubscriptionCheckoutTests(TestCase):
+    def setUp(self):
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        self.plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def post_checkout(self):
+        return self.api.post("/api/billing/checkout/", {"plan_id": self.plan.id}, format="json")
+
+    def test_checkout_creates_subscription_through_gateway(self):
+        with override_razorpay_client(StubRazorpayClient()) as razorpay:
+            response = self.post_checkout()
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["subscription_id"], "sub_1")
+        self.assertEqual(razorpay.subscription.created[0]["plan_id"], "plan_pro")
+        self.assertEqual(OwnerSubscription.objects.get(owner=self.user).razorpay_subscription_id, "sub_1")
+
+    def test_checkout_reports_unavailable_gateway(self):
+        with override_razorpay_client(FlakyClient(requests.ReadTimeout())):
+            response = self.post_checkout()
+
+        self.assertEqual(response.status_code, 503)
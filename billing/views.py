@@ -1,48 +1,71 @@
-from rest_framework.views import APIView
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import APIException, NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
 
+from gym.async_api import AsyncAPIView
 from .models import SaaSPlan, OwnerSubscription
-from .client import razorpay_client
+from .client import UNAVAILABLE_ERRORS, get_razorpay_client
+from .entitlements import invalidate_entitlement
 
 
-class CreateSubscriptionCheckout(APIView):
-    permission_classes = []
+class PaymentGatewayUnavailable(APIException):
+    status_code = 503
+    default_detail = "Payment gateway is unavailable. Please try again shortly."
+    default_code = "payment_gateway_unavailable"
 
-    def post(self, request):
+
+class CreateSubscriptionCheckout(AsyncAPIView):
+    """
+    Start a Razorpay subscription for the owner.
+
+    Async so the Razorpay round trip does not hold a worker under ASGI: the
+    blocking SDK call runs in a thread outside the request's thread (it
+    touches no database), and the ORM calls use the async API.
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def post(self, request):
         plan_id = request.data.get("plan_id")
 
       
-        plan = get_object_or_404(SaaSPlan, id=plan_id, is_active=True)
+        plan = await SaaSPlan.objects.filter(id=plan_id, is_active=True).afirst()
+        if plan is None:
+            raise NotFound("No SaaSPlan matches the given query.")
 
     
-        sub, _ = OwnerSubscription.objects.get_or_create(
+        sub, _ = await OwnerSubscription.objects.aget_or_create(
             owner=request.user,
             defaults={"plan": plan}
         )
 
         sub.plan = plan
         sub.status = OwnerSubscription.Status.CREATED
-        sub.save(update_fields=["plan", "status"])
+        await sub.asave(update_fields=["plan", "status"])
+        await sync_to_async(invalidate_entitlement)(sub.owner_id)
 
        
         total_count = 120 if plan.interval == "monthly" else 10
 
-        razorpay_sub = razorpay_client.subscription.create({
-            "plan_id": plan.razorpay_plan_id,
-            "total_count": total_count,
-            "quantity": 1,
-            "customer_notify": 1,
-            "notes": {
-                "owner_id": str(request.user.id),
-                "plan_id": str(plan.id),
-            }
-        })
+        razorpay_client = get_razorpay_client()
+        create_subscription = sync_to_async(razorpay_client.subscription.create, thread_sensitive=False)
+        try:
+            razorpay_sub = await create_subscription({
+                "plan_id": plan.razorpay_plan_id,
+                "total_count": total_count,
+                "quantity": 1,
+                "customer_notify": 1,
+                "notes": {
+                    "owner_id": str(request.user.id),
+                    "plan_id": str(plan.id),
+                }
+            })
+        except UNAVAILABLE_ERRORS:
+            raise PaymentGatewayUnavailable()
 
         
         sub.razorpay_subscription_id = razorpay_sub["id"]
-        sub.save(update_fields=["razorpay_subscription_id"])
+        await sub.asave(update_fields=["razorpay_subscription_id"])
 
        
         return Response({
@@ -1,7 +1,9 @@
 import json
-from datetime import datetime, timezone as dt_timezone
+import threading
+from collections import OrderedDict
 
 from django.conf import settings
+from django.db import IntegrityError
 from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
@@ -9,18 +11,43 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 
-from .models import OwnerSubscription, PaymentEvent
-from .client import razorpay_client
+from .models import WebhookEvent
+from .client import get_razorpay_client
+from .processing import _ts_to_dt
 
 
-def _ts_to_dt(ts: int | None):
-    if not ts:
-        return None
-    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+class RecentEventIds:
+    """Bounded, thread-safe set of event ids this worker has already stored."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, event_id):
+        with self._lock:
+            return event_id in self._ids
+
+    def add(self, event_id):
+        with self._lock:
+            self._ids[event_id] = None
+            self._ids.move_to_end(event_id)
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+
+
+_recent_event_ids = RecentEventIds()
 
 
 @method_decorator(csrf_exempt, name="dispatch")
 class RazorpayWebhookView(APIView):
+    """
+    Verifies and stores Razorpay webhooks, then ACKs.
+
+    No outbound calls happen here: `manage.py process_webhooks` applies the
+    stored events (billing/processing.py), so Razorpay retry storms only cost
+    one INSERT per delivery.
+    """
     authentication_classes = []
     permission_classes = [AllowAny]
 
@@ -37,9 +64,16 @@ class RazorpayWebhookView(APIView):
         if not signature:
             return HttpResponse("Missing signature", status=400)
 
+        # Razorpay redelivers with the same event id. Duplicates are answered
+        # from memory before any HMAC, JSON parsing or DB work. Only verified
+        # events are remembered, so forged ids can't suppress real ones.
+        event_id = request.headers.get("X-Razorpay-Event-Id") or None
+        if event_id and event_id in _recent_event_ids:
+            return HttpResponse(status=200)
+
         # 2) Verify signature (must verify on raw string body)
         try:
-            razorpay_client.utility.verify_webhook_signature(
+            get_razorpay_client().utility.verify_webhook_signature(
                 body_str,
                 signature,
                 settings.RAZORPAY_WEBHOOK_SECRET,
@@ -47,14 +81,16 @@ class RazorpayWebhookView(APIView):
         except Exception:
             return HttpResponse("Invalid signature", status=400)
 
+        if event_id and WebhookEvent.objects.filter(event_id=event_id).exists():
+            _recent_event_ids.add(event_id)
+            return HttpResponse(status=200)
+
         # 3) Parse JSON
         try:
             payload = json.loads(body_str)
         except json.JSONDecodeError:
             return HttpResponse("Invalid JSON", status=400)
 
-        event = payload.get("event", "unknown")
-
         # 4) Extract subscription id (Razorpay sends different payload shapes for different events)
         subscription_id = (
             payload.get("payload", {})
@@ -67,82 +103,21 @@ class RazorpayWebhookView(APIView):
         if not subscription_id:
             return HttpResponse(status=200)
 
-        sub = OwnerSubscription.objects.filter(
-            razorpay_subscription_id=subscription_id
-        ).first()
-
-        # If we can't match, ACK 200 (don't retry forever)
-        if not sub:
-            return HttpResponse(status=200)
-
-        # 5) Log the event (ONLY when sub exists)
-        payment_entity = (
-            payload.get("payload", {})
-            .get("payment", {})
-            .get("entity", {})
-        )
-        invoice_entity = (
-            payload.get("payload", {})
-            .get("invoice", {})
-            .get("entity", {})
-        )
-
-        amount_paise = payment_entity.get("amount")
-        amount_inr = (amount_paise // 100) if isinstance(amount_paise, int) else None
-
-        PaymentEvent.objects.create(
-            subscription=sub,
-            event_type=event,
-            razorpay_payment_id=payment_entity.get("id"),
-            razorpay_invoice_id=invoice_entity.get("id"),
-            amount_inr=amount_inr,
-            payload=payload,
-        )
-
-        # 6) Update subscription status + dates
-        if event in ("subscription.activated", "subscription.charged", "subscription.resumed"):
-            sub.status = OwnerSubscription.Status.ACTIVE
-
-            # Fetch fresh dates from Razorpay (safe)
-            try:
-                rp = razorpay_client.subscription.fetch(subscription_id)
-                sub.current_start = _ts_to_dt(rp.get("current_start"))
-                sub.current_end = _ts_to_dt(rp.get("current_end"))
-
-                # Optional: store customer_id if you have the field
-                rp_customer_id = rp.get("customer_id")
-                if rp_customer_id and hasattr(sub, "razorpay_customer_id") and not sub.razorpay_customer_id:
-                    sub.razorpay_customer_id = rp_customer_id
-
-            except Exception:
-                # Don’t fail webhook if Razorpay fetch fails
-                pass
-
-            sub.save()
-
-        elif event in ("subscription.halted", "subscription.paused"):
-            sub.status = OwnerSubscription.Status.HALTED
-            sub.save(update_fields=["status"])
-
-        elif event == "subscription.cancelled":
-            sub.status = OwnerSubscription.Status.CANCELLED
-
-            try:
-               rp = razorpay_client.subscription.fetch(subscription_id)
-               sub.current_start = _ts_to_dt(rp.get("current_start"))
-               sub.current_end = _ts_to_dt(rp.get("current_end"))
-
-               rp_customer_id = rp.get("customer_id")
-               if rp_customer_id and hasattr(sub, "razorpay_customer_id") and not sub.razorpay_customer_id:
-                   sub.razorpay_customer_id = rp_customer_id
-            except Exception:
-              pass
-
-            sub.save()
-                
+        # 5) Persist to the inbox; the worker does the rest
+        created_at = payload.get("created_at")
+        try:
+            WebhookEvent.objects.create(
+                event_id=event_id,
+                event_type=payload.get("event", "unknown"),
+                razorpay_subscription_id=subscription_id,
+                payload=payload,
+                event_created_at=_ts_to_dt(created_at if isinstance(created_at, int) else None),
+            )
+        except IntegrityError:
+            # A concurrent delivery of the same event won the insert.
+            pass
 
-        elif event == "subscription.completed":
-            sub.status = OwnerSubscription.Status.EXPIRED
-            sub.save(update_fields=["status"])
+        if event_id:
+            _recent_event_ids.add(event_id)
 
-        return HttpResponse(status=200)
\ No newline at end of file
+        return HttpResponse(status=200)
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class GymConfig(AppConfig):
     name = 'gym'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,47 @@
+"""
+APIView for async handlers, served without a thread per request under ASGI.
+
+DRF's dispatch is synchronous, so an `async def get()` on a plain APIView
+is never awaited. AsyncAPIView awaits the handler and runs the synchronous
+parts of the request cycle (authentication, permission and throttle checks,
+which may query the database) in a worker thread via sync_to_async.
+Exception handling and rendering are unchanged.
+
+Under WSGI, Django runs these views in a per-request event loop, so they
+still work, only without the benefit.
+"""
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose method handlers are coroutines (`async def get(...)`)."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = await handler(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
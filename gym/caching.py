@@ -0,0 +1,189 @@
+"""
+Versioned response cache for the dashboard's polled read endpoints.
+
+Every gym (and every owner, for the gym list) has a generation number in
+the cache. Writes bump it: post_save/post_delete signals cover ordinary
+saves, and bulk write paths call `bump_gym_generation` themselves. Cached
+responses and ETags include the generation, so a bump makes every older
+entry unreachable at once without having to find and delete them.
+
+A hit skips get_gym(), the queries and serialization. That is safe because
+the key includes the user, and any change to a gym, including its owner,
+bumps its generation. A matching If-None-Match gets a 304 after a single
+cache read.
+
+Caching is only on when RESPONSE_CACHE_ALIAS names a shared cache (by
+default the Redis one REDIS_URL configures) and RESPONSE_CACHE_TTL is
+positive. A per-process cache would only see its own worker's bumps, and
+the other workers would keep serving old answers and 304s, so with one the
+decorated views run uncached and send no ETag.
+"""
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.crypto import salted_hmac
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# Backends whose contents are private to one process.
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias) -> bool:
+    """True when `alias` names a cache that every worker process reads and writes."""
+    return bool(alias) and not isinstance(caches[alias], PROCESS_LOCAL_CACHES)
+
+
+def response_cache_enabled() -> bool:
+    return settings.RESPONSE_CACHE_TTL > 0 and is_shared_cache(settings.RESPONSE_CACHE_ALIAS)
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def gym_scope(gym_id):
+    return f"gym:{gym_id}"
+
+
+def owner_scope(user_id):
+    return f"owner:{user_id}"
+
+
+def _generation_key(scope):
+    return f"generation:{scope}"
+
+
+def generation(scope) -> int:
+    key = _generation_key(scope)
+    value = _cache().get(key)
+    if value is None:
+        # Seed from the clock so an evicted counter never repeats an old value
+        # (and with it an ETag a client may still hold).
+        _cache().add(key, time.time_ns(), settings.RESPONSE_CACHE_TTL)
+        value = _cache().get(key)
+    return value
+
+
+async def ageneration(scope) -> int:
+    key = _generation_key(scope)
+    value = await _cache().aget(key)
+    if value is None:
+        await _cache().aadd(key, time.time_ns(), settings.RESPONSE_CACHE_TTL)
+        value = await _cache().aget(key)
+    return value
+
+
+def bump(scope):
+    key = _generation_key(scope)
+    try:
+        _cache().incr(key)
+    except ValueError:
+        _cache().add(key, time.time_ns(), settings.RESPONSE_CACHE_TTL)
+
+
+def bump_gym_generation(gym_id):
+    """Invalidate the gym's cached responses once the current transaction commits."""
+    if not response_cache_enabled():
+        return
+    # After commit, or a concurrent request could cache pre-commit data under
+    # the new generation.
+    scope = gym_scope(gym_id)
+    transaction.on_commit(lambda: bump(scope))
+
+
+def bump_owner_generation(owner_id):
+    if not response_cache_enabled():
+        return
+    scope = owner_scope(owner_id)
+    transaction.on_commit(lambda: bump(scope))
+
+
+def _gym_from_url(view):
+    return gym_scope(view.kwargs["gym_id"])
+
+
+def _etag(request, scope, current):
+    # The local date is in the key because "expiring" and "this month"
+    # move at midnight even when nothing was written.
+    version = f"{scope}:{current}:{timezone.localdate().isoformat()}"
+    digest = salted_hmac(
+        "gym.caching",
+        f"{request.user.pk}:{request.get_full_path()}:{version}",
+    ).hexdigest()
+    return f'W/"{digest[:32]}"', f"response:{digest}"
+
+
+def _not_modified(request, etag):
+    return etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+
+
+def _finalize(response, etag):
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response["ETag"] = etag
+        # Always revalidate; the ETag makes that cheap.
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def generation_cached(get_scope=_gym_from_url):
+    """
+    Decorate a view's get() to serve it from the versioned cache, with
+    ETag / If-None-Match support.
+
+    `get_scope(view)` names the generation the response depends on: the
+    gym in the URL by default. Works on sync and async handlers; an async
+    handler must return a Response whose `.data` is what gets cached.
+    Without a shared cache (see response_cache_enabled) get() runs as is.
+    """
+    def decorator(get):
+        if iscoroutinefunction(get):
+            @wraps(get)
+            async def async_wrapper(view, request, *args, **kwargs):
+                if not response_cache_enabled():
+                    return await get(view, request, *args, **kwargs)
+                scope = get_scope(view)
+                etag, key = _etag(request, scope, await ageneration(scope))
+                if _not_modified(request, etag):
+                    return _finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+                data = await _cache().aget(key)
+                if data is not None:
+                    return _finalize(Response(data), etag)
+
+                response = await get(view, request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    await _cache().aset(key, response.data, settings.RESPONSE_CACHE_TTL)
+                return _finalize(response, etag)
+            return async_wrapper
+
+        @wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            if not response_cache_enabled():
+                return get(view, request, *args, **kwargs)
+            scope = get_scope(view)
+            etag, key = _etag(request, scope, generation(scope))
+            if _not_modified(request, etag):
+                return _finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+            data = _cache().get(key)
+            if data is not None:
+                return _finalize(Response(data), etag)
+
+            response = get(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                _cache().set(key, response.data, settings.RESPONSE_CACHE_TTL)
+            return _finalize(response, etag)
+        return wrapper
+    return decorator
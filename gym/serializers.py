@@ -1,9 +1,36 @@
 from rest_framework import serializers
+
+from gymmm.metrics import TimedSerializerMixin
 from .models import Gym
 
-class GymSerializer(serializers.ModelSerializer):
+class GymSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Gym
         fields = ("id", "name", "address")
         read_only_fields = ("id",)
 
+
+class GymPortfolioSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A gym with the totals annotated by GymPortfolioView."""
+
+    total_students = serializers.ReadOnlyField()
+    pending_students = serializers.ReadOnlyField()
+    expiring_students = serializers.ReadOnlyField()
+    total_expected_revenue = serializers.ReadOnlyField()
+    total_collected = serializers.ReadOnlyField()
+    total_pending = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Gym
+        fields = (
+            "id",
+            "name",
+            "address",
+            "total_students",
+            "pending_students",
+            "expiring_students",
+            "total_expected_revenue",
+            "total_collected",
+            "total_pending",
+        )
+        read_only_fields = fields
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_gym_generation, bump_owner_generation
+from .models import Gym
+
+
+@receiver([post_save, post_delete], sender=Gym)
+def gym_changed(sender, instance, **kwargs):
+    bump_owner_generation(instance.owner_id)
+    bump_gym_generation(instance.pk)
@@ -1,3 +1,189 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from billing.entitlements import clear_entitlement_cache
+from billing.models import SaaSPlan, OwnerSubscription
+from members.models import Member
+from users.models import User
+from .models import Gym
+
+
+LOCAL_CACHE = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+SHARED_CACHE = {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_response_cache"}
+
+
+class GymOwnerTestCase(TestCase):
+    def setUp(self):
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        OwnerSubscription.objects.create(owner=self.user, plan=plan, status=OwnerSubscription.Status.ACTIVE)
+        self.gym = Gym.objects.create(owner=self.user, name="Iron Temple")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_member(self, gym, name, **fields):
+        fields.setdefault("end_date", timezone.localdate() + timedelta(days=30))
+        fields.setdefault("total_fee", Decimal("1000.00"))
+        return Member.objects.create(gym=gym, name=name, **fields)
+
+
+@override_settings(CACHES={"default": LOCAL_CACHE, "shared": SHARED_CACHE}, RESPONSE_CACHE_ALIAS="shared")
+class ResponseCacheTests(GymOwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        call_command("createcachetable", "test_response_cache")
+        self.summary_url = reverse("revenue-summary", kwargs={"gym_id": self.gym.id})
+
+    def member_queries(self, queries):
+        return [query for query in queries if "members_member" in query["sql"]]
+
+    def test_repeat_read_is_served_from_the_cache(self):
+        first = self.client.get(self.summary_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.summary_url)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(self.member_queries(queries), [])
+
+    def test_matching_if_none_match_gets_304(self):
+        etag = self.client.get(self.summary_url)["ETag"]
+
+        response = self.client.get(self.summary_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_generation_bump_changes_the_etag(self):
+        etag = self.client.get(self.summary_url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_member(self.gym, "New Member")
+        response = self.client.get(self.summary_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["total_students"], 1)
+
+    def test_owner_generation_covers_the_gym_list(self):
+        url = reverse("my-gyms-list-create")
+        etag = self.client.get(url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Gym.objects.create(owner=self.user, name="Second Gym")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(RESPONSE_CACHE_TTL=0)
+    def test_zero_ttl_turns_caching_off(self):
+        self.client.get(self.summary_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.summary_url)
+
+        self.assertNotIn("ETag", response)
+        self.assertNotEqual(self.member_queries(queries), [])
+
+
+@override_settings(CACHES={"default": LOCAL_CACHE})
+class ProcessLocalResponseCacheTests(GymOwnerTestCase):
+    def test_per_process_cache_is_never_used(self):
+        url = reverse("revenue-summary", kwargs={"gym_id": self.gym.id})
+        for alias in (None, "default"):
+            with self.subTest(alias=alias), override_settings(RESPONSE_CACHE_ALIAS=alias):
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("ETag", response)
+                self.assertTrue(any("members_member" in query["sql"] for query in queries))
+
+
+class GymPortfolioTests(GymOwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("my-gyms-summary")
+        self.second = Gym.objects.create(owner=self.user, name="Second Gym")
+        today = timezone.localdate()
+
+        self.add_member(self.gym, "Paid", amount_paid=Decimal("1000.00"), payment_status=Member.PaymentStatus.PAID)
+        self.add_member(
+            self.gym, "Partial",
+            amount_paid=Decimal("400.00"), payment_status=Member.PaymentStatus.PARTIAL,
+            end_date=today + timedelta(days=3),
+        )
+        self.add_member(self.gym, "Left", amount_paid=Decimal("0.00"), is_active=False)
+        self.add_member(self.second, "Unpaid", total_fee=Decimal("1500.00"), end_date=today + timedelta(days=10))
+
+        other = User.objects.create_user(username="other@example.com", password="secret123")
+        self.add_member(Gym.objects.create(owner=other, name="Elsewhere"), "Stranger")
+
+    def test_each_gym_matches_its_revenue_summary(self):
+        gyms = self.client.get(self.url).data["gyms"]
+
+        self.assertEqual([gym["name"] for gym in gyms], ["Iron Temple", "Second Gym"])
+        for gym in gyms:
+            summary = self.client.get(reverse("revenue-summary", kwargs={"gym_id": gym["id"]})).data
+            with self.subTest(gym=gym["name"]):
+                for field, value in summary.items():
+                    self.assertEqual(Decimal(gym[field]), Decimal(value), field)
+
+    def test_totals_add_up_every_gym(self):
+        data = self.client.get(self.url).data
+
+        self.assertEqual(data["totals"], {
+            "total_students": 3,
+            "pending_students": 2,
+            "expiring_students": 1,
+            "total_expected_revenue": Decimal("3500.00"),
+            "total_collected": Decimal("1400.00"),
+            "total_pending": Decimal("2100.00"),
+        })
+
+    def test_expiring_within_widens_the_window(self):
+        data = self.client.get(self.url, {"expiring_within": 14}).data
+
+        self.assertEqual([gym["expiring_students"] for gym in data["gyms"]], [1, 1])
+        self.assertEqual(data["totals"]["expiring_students"], 2)
+
+    def test_expiring_within_must_be_a_number(self):
+        response = self.client.get(self.url, {"expiring_within": "soon"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("expiring_within", response.data)
+
+    def test_gym_without_members_reports_zeros(self):
+        Gym.objects.create(owner=self.user, name="Zero Gym")
+
+        gym = self.client.get(self.url).data["gyms"][-1]
+
+        self.assertEqual(gym["name"], "Zero Gym")
+        self.assertEqual(gym["total_students"], 0)
+        self.assertEqual(gym["total_expected_revenue"], Decimal("0.00"))
+        self.assertEqual(gym["total_pending"], Decimal("0.00"))
+
+    def test_one_query_regardless_of_gym_count(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+
+        for i in range(5):
+            self.add_member(Gym.objects.create(owner=self.user, name=f"Branch {i}"), f"Branch member {i}")
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.url)
+
+        self.assertEqual(len(many), len(few))
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import MyGymsListCreateView
+from .views import GymPortfolioView, MyGymsListCreateView
 
 urlpatterns = [
     path("", MyGymsListCreateView.as_view(), name="my-gyms-list-create"),
+    path("summary/", GymPortfolioView.as_view(), name="my-gyms-summary"),
 ]
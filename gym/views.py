@@ -1,7 +1,19 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListAPIView,ListCreateAPIView
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from billing.permission import HasActiveSubscription
+from members.models import Member
+from .caching import generation_cached, owner_scope
 from .models import Gym
-from .serializers import GymSerializer
+from .serializers import GymPortfolioSerializer, GymSerializer
 
 class MyGymsListCreateView(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
@@ -10,5 +22,63 @@ class MyGymsListCreateView(ListCreateAPIView):
     def get_queryset(self):
         return Gym.objects.filter(owner=self.request.user)
 
+    @generation_cached(lambda view: owner_scope(view.request.user.pk))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
\ No newline at end of file
+        serializer.save(owner=self.request.user)
+
+
+def _money_sum(expression, condition):
+    return Coalesce(
+        Sum(expression, filter=condition),
+        Value(Decimal("0.00")),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class GymPortfolioView(ListAPIView):
+    """
+    RevenueSummaryView's numbers for every gym the owner has, plus members
+    expiring within ?expiring_within= days (default 7), in one grouped query.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    serializer_class = GymPortfolioSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        try:
+            days = int(self.request.query_params.get("expiring_within", 7))
+        except ValueError:
+            raise ValidationError({"expiring_within": "Must be a whole number of days."})
+        today = timezone.localdate()
+
+        active = Q(members__is_active=True)
+        outstanding = Q(
+            members__payment_status__in=[Member.PaymentStatus.PENDING, Member.PaymentStatus.PARTIAL],
+        )
+        expiring = Q(members__end_date__gte=today, members__end_date__lte=today + timedelta(days=days))
+
+        return (
+            Gym.objects
+            .filter(owner=self.request.user)
+            .annotate(
+                total_students=Count("members", filter=active),
+                pending_students=Count("members", filter=active & outstanding),
+                expiring_students=Count("members", filter=active & expiring),
+                total_expected_revenue=_money_sum("members__total_fee", active),
+                total_collected=_money_sum("members__amount_paid", active),
+                total_pending=_money_sum(F("members__total_fee") - F("members__amount_paid"), active),
+            )
+            .order_by("name", "id")
+        )
+
+    def list(self, request, *args, **kwargs):
+        gyms = self.get_serializer(self.get_queryset(), many=True).data
+        totals = {
+            field: sum(gym[field] for gym in gyms)
+            for field in GymPortfolioSerializer.Meta.fields
+            if field not in ("id", "name", "address")
+        }
+        return Response({"gyms": gyms, "totals": totals})
@@ -0,0 +1,329 @@
+"""
+Per-endpoint request metrics.
+
+RequestMetricsMiddleware times every request and, through a database
+execute wrapper, counts its queries and their time. Serializers built on
+TimedSerializerMixin add the time spent building their `.data`
+("serialize", including any queries lazy loads run there, which also count
+towards "db"), and TimedJSONRenderer the time spent rendering the response
+body ("render"). Each request is
+filed under its URL name (e.g. "revenue-summary") in an in-process
+histogram, which /api/health/metrics exposes to staff users. The same
+numbers go back to the client in a Server-Timing header.
+
+A streaming response (the CSV/NDJSON exports) runs most of its queries
+while the body is sent, after the view has returned, so the probe stays
+attached until the stream is exhausted or closed and the request is
+recorded then. Its headers have gone out by that point, so streamed
+responses carry no Server-Timing header.
+
+A request slower than REQUEST_METRICS_SLOW_MS is logged with its slowest
+SQL statements (placeholders only, never parameters), for a sampled
+REQUEST_METRICS_SLOW_SAMPLE_RATE fraction of such requests.
+
+The histograms are per process: with several workers, each one reports only
+the requests it served.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in milliseconds (and in queries for the query histogram).
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Queries kept per request for the slow-request log.
+MAX_SAMPLED_QUERIES = 200
+SLOW_LOG_QUERIES = 5
+
+_current_probe = ContextVar("request_metrics_probe", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram; not thread-safe on its own (see MetricsRegistry)."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the `fraction` quantile (max for the overflow bucket)."""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 2) if self.count else 0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": round(self.max, 2),
+            "buckets": dict(zip([*map(str, self.bounds), "+Inf"], self.counts)),
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.errors = 0
+        self.total_ms = Histogram(LATENCY_BUCKETS)
+        self.db_ms = Histogram(LATENCY_BUCKETS)
+        self.serialize_ms = Histogram(LATENCY_BUCKETS)
+        self.render_ms = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+
+    def summary(self):
+        return {
+            "requests": self.total_ms.count,
+            "errors": self.errors,
+            "total_ms": self.total_ms.summary(),
+            "db_ms": self.db_ms.summary(),
+            "serialize_ms": self.serialize_ms.summary(),
+            "render_ms": self.render_ms.summary(),
+            "queries": self.queries.summary(),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, probe, total_ms, status_code):
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self._endpoints[endpoint] = EndpointMetrics()
+            if status_code >= 500:
+                metrics.errors += 1
+            metrics.total_ms.observe(total_ms)
+            metrics.db_ms.observe(probe.db_ms)
+            metrics.serialize_ms.observe(probe.serialize_ms)
+            metrics.render_ms.observe(probe.render_ms)
+            metrics.queries.observe(probe.query_count)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: metrics.summary() for endpoint, metrics in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestProbe:
+    """Database execute wrapper that tallies one request's queries."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.serializing = False
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.query_count += 1
+            self.db_ms += elapsed
+            if len(self.queries) < MAX_SAMPLED_QUERIES:
+                self.queries.append((elapsed, sql))
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin that reports the time spent building `.data` to the
+    current request's probe. Serializers nested in one being timed (fields,
+    or the rows of a TimedListSerializer) are not counted a second time.
+
+    For `many=True`, subclasses default Meta.list_serializer_class to
+    TimedListSerializer, so the list is timed as a whole.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, "Meta", None)
+        if meta is not None and not hasattr(meta, "list_serializer_class"):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        probe = _current_probe.get()
+        if probe is None or probe.serializing:
+            return super().data
+
+        probe.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            probe.serialize_ms += (time.perf_counter() - started) * 1000
+            probe.serializing = False
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    pass
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its render time to the current request's probe."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        probe = _current_probe.get()
+        if probe is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            probe.render_ms += (time.perf_counter() - started) * 1000
+
+
+def _endpoint(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "<unresolved>"
+
+
+def _server_timing(probe, total_ms):
+    return (
+        f'db;dur={probe.db_ms:.1f};desc="{probe.query_count} queries", '
+        f"serialize;dur={probe.serialize_ms:.1f}, "
+        f"render;dur={probe.render_ms:.1f}, "
+        f"total;dur={total_ms:.1f}"
+    )
+
+
+def _log_slow(endpoint, request, probe, total_ms):
+    slowest = sorted(probe.queries, key=lambda query: query[0], reverse=True)[:SLOW_LOG_QUERIES]
+    logger.warning(
+        "Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in DB\n%s",
+        request.method,
+        request.path,
+        endpoint,
+        total_ms,
+        probe.query_count,
+        probe.db_ms,
+        "\n".join(f"  {elapsed:.1f} ms  {sql}" for elapsed, sql in slowest),
+    )
+
+
+# Database connections are per thread and the async ORM queries from
+# sync_to_async's thread, so async code attaches the probe there.
+def _attach(probe):
+    connection.execute_wrappers.append(probe)
+
+
+def _detach(probe):
+    connection.execute_wrappers.remove(probe)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        probe, token, started = self.start()
+        try:
+            with connection.execute_wrapper(probe):
+                response = self.get_response(request)
+        finally:
+            _current_probe.reset(token)
+        return self.finish(request, response, probe, started)
+
+    async def __acall__(self, request):
+        probe, token, started = self.start()
+        await sync_to_async(_attach)(probe)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_detach)(probe)
+            _current_probe.reset(token)
+        return self.finish(request, response, probe, started)
+
+    def start(self):
+        probe = RequestProbe()
+        return probe, _current_probe.set(probe), time.perf_counter()
+
+    def finish(self, request, response, probe, started):
+        if response.streaming:
+            measure = self.ameasure_stream if response.is_async else self.measure_stream
+            response.streaming_content = measure(response.streaming_content, request, response, probe, started)
+            return response
+
+        total_ms = self.record(request, response, probe, started)
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response["Server-Timing"] = _server_timing(probe, total_ms)
+        return response
+
+    def measure_stream(self, content, request, response, probe, started):
+        token = _current_probe.set(probe)
+        try:
+            with connection.execute_wrapper(probe):
+                yield from content
+        finally:
+            _current_probe.reset(token)
+            self.record(request, response, probe, started)
+
+    async def ameasure_stream(self, content, request, response, probe, started):
+        token = _current_probe.set(probe)
+        await sync_to_async(_attach)(probe)
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await sync_to_async(_detach)(probe)
+            _current_probe.reset(token)
+            self.record(request, response, probe, started)
+
+    def record(self, request, response, probe, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        endpoint = _endpoint(request)
+        registry.record(endpoint, probe, total_ms, response.status_code)
+
+        if total_ms >= settings.REQUEST_METRICS_SLOW_MS and random.random() < settings.REQUEST_METRICS_SLOW_SAMPLE_RATE:
+            _log_slow(endpoint, request, probe, total_ms)
+        return total_ms
@@ -35,6 +35,76 @@ ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "*").split(",")
 TEST_API_KEY_ID = os.getenv("TEST_API_KEY_ID", "")
 TEST_KEY_SECRET = os.getenv("TEST_KEY_SECRET", "")
 RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+# Outbound Razorpay calls (billing/client.py). Timeouts are in seconds.
+RAZORPAY_CONNECT_TIMEOUT = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT", "3.05"))
+RAZORPAY_READ_TIMEOUT = float(os.getenv("RAZORPAY_READ_TIMEOUT", "10"))
+RAZORPAY_POOL_SIZE = int(os.getenv("RAZORPAY_POOL_SIZE", "10"))
+RAZORPAY_MAX_RETRIES = int(os.getenv("RAZORPAY_MAX_RETRIES", "2"))
+RAZORPAY_RETRY_BACKOFF = float(os.getenv("RAZORPAY_RETRY_BACKOFF", "0.2"))
+RAZORPAY_RETRY_BACKOFF_MAX = float(os.getenv("RAZORPAY_RETRY_BACKOFF_MAX", "2"))
+# Consecutive failures before calls fail fast, and for how long.
+RAZORPAY_BREAKER_THRESHOLD = int(os.getenv("RAZORPAY_BREAKER_THRESHOLD", "5"))
+RAZORPAY_BREAKER_COOLDOWN = float(os.getenv("RAZORPAY_BREAKER_COOLDOWN", "30"))
+
+# =========================
+# Caches
+# =========================
+# "default" is per process. REDIS_URL (e.g. Railway's Redis add-on) adds a
+# "shared" alias that every web worker and manage.py process_webhooks read
+# and write; the caches below use it when it is there.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+SHARED_CACHE_ALIAS = "shared" if REDIS_URL else None
+
+# =========================
+# Subscription entitlement cache
+# =========================
+# Defaults to the shared cache, so webhook invalidations reach every worker
+# at once. Without one: a per-worker in-process LRU, which only learns of
+# changes made elsewhere when its entries expire.
+ENTITLEMENT_CACHE_ALIAS = os.getenv("ENTITLEMENT_CACHE_ALIAS") or SHARED_CACHE_ALIAS
+# Upper bound on how long a worker may serve a stale answer.
+ENTITLEMENT_CACHE_TTL = int(os.getenv("ENTITLEMENT_CACHE_TTL", "300"))
+ENTITLEMENT_CACHE_MAX_ENTRIES = 10000
+
+# =========================
+# Dashboard response cache (gym/caching.py)
+# =========================
+# Defaults to the shared cache (REDIS_URL above), which every worker reads,
+# so every worker sees every bump. Unset, or a per-process backend
+# (LocMem/Dummy) = caching off.
+RESPONSE_CACHE_ALIAS = os.getenv("RESPONSE_CACHE_ALIAS") or SHARED_CACHE_ALIAS
+# 0 also turns caching off.
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+# =========================
+# Member sweeps (manage.py run_member_sweeps)
+# =========================
+# Memberships this many days past end_date are marked inactive.
+MEMBER_EXPIRY_GRACE_DAYS = int(os.getenv("MEMBER_EXPIRY_GRACE_DAYS", "0"))
+
+# =========================
+# ASGI read path (members/async_views.py)
+# =========================
+# Route the dashboard, ledger and receipt reads to async views. Turn on when
+# serving gymmm.asgi (e.g. gunicorn -k uvicorn.workers.UvicornWorker).
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "0").lower() in ("1", "true", "yes")
+
+# =========================
+# Request metrics (gymmm/metrics.py, /api/health/metrics)
+# =========================
+REQUEST_METRICS_SERVER_TIMING = os.getenv("REQUEST_METRICS_SERVER_TIMING", "1") == "1"
+# Requests at least this slow are logged with their slowest SQL...
+REQUEST_METRICS_SLOW_MS = float(os.getenv("REQUEST_METRICS_SLOW_MS", "500"))
+# ...for this fraction of them.
+REQUEST_METRICS_SLOW_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SLOW_SAMPLE_RATE", "1.0"))
 
 # =========================
 # Apps
@@ -62,6 +132,7 @@ INSTALLED_APPS = [
 # Middleware (order matters)
 # =========================
 MIDDLEWARE = [
+    "gymmm.metrics.RequestMetricsMiddleware",      # first, so its timing covers the rest
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # right after SecurityMiddleware
     "corsheaders.middleware.CorsMiddleware",       # CORS early
@@ -164,14 +235,26 @@ AUTH_USER_MODEL = "users.User"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        # JSONRenderer that reports render time to gymmm.metrics
+        "gymmm.metrics.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
+    # Access tokens carry subscription entitlement claims (users/tokens.py)
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.EntitlementTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.EntitlementTokenRefreshSerializer",
 }
 
+# Entitlement claims this close to `access_until` are re-checked against the DB,
+# so a renewal shows up without waiting for a new token.
+ENTITLEMENT_CLAIM_LEEWAY = timedelta(minutes=10)
+
 # =========================
 # CORS (React/Vite + production)
 # =========================
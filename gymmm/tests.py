@@ -0,0 +1,157 @@
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from billing.entitlements import clear_entitlement_cache
+from billing.models import SaaSPlan, OwnerSubscription
+from gym.models import Gym
+from members.models import Member
+from users.models import User
+from .metrics import RequestMetricsMiddleware, registry
+
+
+SERVER_TIMING = re.compile(r'^db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        OwnerSubscription.objects.create(owner=self.user, plan=plan, status=OwnerSubscription.Status.ACTIVE)
+        self.gym = Gym.objects.create(owner=self.user, name="Iron Temple")
+        Member.objects.bulk_create(
+            Member(
+                gym=self.gym,
+                name=f"Member {i}",
+                end_date=timezone.localdate() + timedelta(days=30),
+                total_fee=Decimal("1000.00"),
+            )
+            for i in range(3)
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def url(self, name):
+        return reverse(name, kwargs={"gym_id": self.gym.id})
+
+    def test_records_each_request_under_its_url_name(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url("revenue-summary"))
+        # The next request resets connection.queries.
+        first_request_queries = len(queries)
+        self.client.get(self.url("revenue-summary"))
+
+        metrics = registry.snapshot()["revenue-summary"]
+        self.assertEqual(metrics["requests"], 2)
+        self.assertEqual(metrics["errors"], 0)
+        self.assertEqual(metrics["queries"]["max"], first_request_queries)
+        self.assertEqual(metrics["serialize_ms"]["count"], 2)
+        self.assertEqual(metrics["render_ms"]["count"], 2)
+
+    def test_serializer_time_is_reported_apart_from_rendering(self):
+        self.client.get(self.url("revenue-summary"))
+        self.client.get(self.url("gym-members-list-create"))
+
+        snapshot = registry.snapshot()
+        # The summary is a plain dict; the member list goes through MemberSerializer.
+        self.assertEqual(snapshot["revenue-summary"]["serialize_ms"]["max"], 0)
+        self.assertGreater(snapshot["gym-members-list-create"]["serialize_ms"]["max"], 0)
+        self.assertGreater(snapshot["gym-members-list-create"]["render_ms"]["max"], 0)
+
+    def test_server_timing_reports_the_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url("revenue-summary"))
+
+        match = SERVER_TIMING.match(response["Server-Timing"])
+        self.assertIsNotNone(match, response["Server-Timing"])
+        self.assertEqual(int(match[1]), len(queries))
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        response = self.client.get(self.url("revenue-summary"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(registry.snapshot()["revenue-summary"]["requests"], 1)
+
+    def test_streamed_export_is_recorded_once_sent(self):
+        response = self.client.get(self.url("gym-members-export-csv"))
+        self.assertNotIn("gym-members-export-csv", registry.snapshot())
+
+        with CaptureQueriesContext(connection) as queries:
+            body = b"".join(response.streaming_content)
+
+        self.assertEqual(body.count(b"\n"), 4)
+        self.assertGreater(len(queries), 0)
+        metrics = registry.snapshot()["gym-members-export-csv"]
+        self.assertEqual(metrics["requests"], 1)
+        self.assertGreaterEqual(metrics["queries"]["max"], len(queries))
+        self.assertNotIn("Server-Timing", response)
+
+    def serve_async(self, get_response):
+        async def fetch():
+            response = await RequestMetricsMiddleware(get_response)(RequestFactory().get("/"))
+            if response.streaming:
+                return b"".join([chunk async for chunk in response.streaming_content])
+            return response.content
+
+        body = async_to_sync(fetch)()
+        return body, registry.snapshot()["<unresolved>"]["queries"]["max"]
+
+    def test_async_view_queries_are_counted(self):
+        async def get_response(request):
+            return HttpResponse(f"{await User.objects.acount()} {await Gym.objects.acount()}")
+
+        self.assertEqual(self.serve_async(get_response), (b"1 1", 2))
+
+    def test_async_stream_keeps_the_probe_attached(self):
+        async def rows():
+            yield f"{await User.objects.acount()}\n"
+            yield f"{await Gym.objects.acount()}\n"
+
+        async def get_response(request):
+            return StreamingHttpResponse(rows())
+
+        self.assertEqual(self.serve_async(get_response), (b"1\n1\n", 2))
+
+    @override_settings(REQUEST_METRICS_SLOW_MS=0, REQUEST_METRICS_SLOW_SAMPLE_RATE=1.0)
+    def test_slow_request_logs_sql_without_parameters(self):
+        with self.assertLogs("gymmm.metrics", "WARNING") as logs:
+            self.client.get(self.url("revenue-summary"))
+
+        self.assertIn("revenue-summary", logs.output[0])
+        self.assertIn("members_member", logs.output[0])
+        self.assertNotIn(self.gym.id.hex, logs.output[0])
+
+
+class MetricsViewTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        self.url = reverse("health-metrics")
+
+    def test_requires_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_authenticate(User.objects.create_user(username="owner@example.com"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff_see_the_histograms(self):
+        self.client.force_authenticate(User.objects.create_user(username="ops@example.com", is_staff=True))
+        self.client.get("/api/health/")
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["endpoints"]["gymmm.views.health"]["requests"], 1)
@@ -17,11 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
-from .views import health
+from .views import MetricsView, health
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/health/", health),
+    path("api/health/metrics", MetricsView.as_view(), name="health-metrics"),
     path("api/auth/", include("users.urls")),
     path("api/gyms/", include("gym.urls")),
     path("api/", include("members.urls")),
@@ -1,6 +1,21 @@
+import os
+
 from django.http import JsonResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import registry
 
 
 def health(request):
     """Public health check — no auth. Use from mobile browser to verify backend is reachable."""
     return JsonResponse({"ok": True})
+
+
+class MetricsView(APIView):
+    """Per-endpoint request histograms for this worker process (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"pid": os.getpid(), "endpoints": registry.snapshot()})
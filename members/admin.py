@@ -1,4 +1,17 @@
 from django.contrib import admin
-from .models import Member
+from .models import Member, MemberSweepRun
 # Register your models here.
-admin.site.register(Member)
\ No newline at end of file
+
+
+@admin.register(Member)
+class MemberAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "phone", "end_date", "payment_status", "is_active")
+    # Member.__str__ shows the gym name.
+    list_select_related = ("gym",)
+
+
+@admin.register(MemberSweepRun)
+class MemberSweepRunAdmin(admin.ModelAdmin):
+    list_display = ("gym", "run_date", "expired_count", "duration_ms")
+    # Gym.__str__ shows the owner's username.
+    list_select_related = ("gym__owner",)
@@ -0,0 +1,101 @@
+"""
+Async versions of the dashboard's polled read endpoints, for ASGI.
+
+Same URLs, queries and responses as their counterparts in members.views
+(which they share query builders with); members.urls routes to them when
+ASYNC_READ_VIEWS is on. Database access uses the async ORM, so a worker
+keeps serving other requests while one waits on Postgres.
+"""
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from billing.permission import HasActiveSubscription
+from gym.async_api import AsyncAPIView
+from gym.caching import generation_cached
+from gym.models import Gym
+from .models import Member
+from .pagination import KeysetCursorPagination, PaymentCursorPagination
+from .serializers import MemberSerializer, PaymentSerializer
+from .views import (
+    expiring_members,
+    gym_payments,
+    parse_days_param,
+    receipt_data,
+    receipt_payments,
+    revenue_summary_aggregates,
+    revenue_summary_data,
+)
+
+
+class AsyncGymScopedMixin:
+    """GymScopedMixin.get_gym() for async views."""
+
+    async def aget_gym(self):
+        if not hasattr(self, "_gym"):
+            gym = await Gym.objects.filter(id=self.kwargs["gym_id"], owner=self.request.user).afirst()
+            if not gym:
+                raise NotFound("Gym not found.")
+            self._gym = gym
+        return self._gym
+
+
+class AsyncListMixin:
+    """ListAPIView.list() over a keyset-paginated queryset from `aget_queryset()`."""
+
+    serializer_class = None
+    pagination_class = None
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.aget_queryset()
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        if page is None:
+            data = self.serializer_class([obj async for obj in queryset], many=True).data
+            return Response(data)
+        return paginator.get_paginated_response(self.serializer_class(page, many=True).data)
+
+
+class AsyncRevenueSummaryView(AsyncGymScopedMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+
+    @generation_cached()
+    async def get(self, request, *args, **kwargs):
+        gym = await self.aget_gym()
+        totals = await Member.objects.filter(gym=gym, is_active=True).aaggregate(**revenue_summary_aggregates())
+        return Response(revenue_summary_data(totals))
+
+
+class AsyncExpiringMembersView(AsyncGymScopedMixin, AsyncListMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    serializer_class = MemberSerializer
+    pagination_class = KeysetCursorPagination
+
+    @generation_cached()
+    async def get(self, request, *args, **kwargs):
+        return await super().get(request, *args, **kwargs)
+
+    async def aget_queryset(self):
+        gym = await self.aget_gym()
+        return expiring_members(gym, parse_days_param(self.request.query_params, "days", 7))
+
+
+class AsyncGymPaymentListView(AsyncGymScopedMixin, AsyncListMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    serializer_class = PaymentSerializer
+    pagination_class = PaymentCursorPagination
+
+    async def aget_queryset(self):
+        return gym_payments(await self.aget_gym(), self.request.query_params)
+
+
+class AsyncPaymentReceiptView(AsyncGymScopedMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+
+    @generation_cached()
+    async def get(self, request, *args, **kwargs):
+        payment = await receipt_payments(self.kwargs, request.user).afirst()
+        if not payment:
+            await self.aget_gym()
+            raise NotFound("Payment not found.")
+        return Response(receipt_data(payment))
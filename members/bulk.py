@@ -0,0 +1,217 @@
+"""
+Bulk write paths for the members app.
+
+These work on whole batches at once: referenced members load in one query,
+receipt numbers are allocated as a block and rows go in with bulk_create.
+Each row is validated with the same rules as the single-object endpoints,
+and problems come back per row instead of failing the whole batch.
+"""
+import csv
+import io
+import zipfile
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from rest_framework import serializers
+
+from gym.caching import bump_gym_generation
+
+from .models import GymDailyRevenue, Member, Payment, ReceiptSequence
+from .serializers import MemberSerializer
+
+
+BULK_PAYMENT_MAX_ROWS = 5000
+
+MEMBER_IMPORT_BATCH_SIZE = 500
+# Imports can be tens of thousands of rows; past this we only count errors.
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_csv_rows(uploaded_file):
+    """Yield dict rows from an uploaded CSV without reading it all into memory."""
+    text = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.DictReader(text):
+            # Blank cells mean "not given", not "empty string".
+            yield {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+    except UnicodeDecodeError:
+        # Excel's plain "CSV" is cp1252; "CSV UTF-8" is what we read.
+        raise serializers.ValidationError('CSV must be UTF-8 (in Excel, save as "CSV UTF-8").')
+    except csv.Error as exc:
+        raise serializers.ValidationError(f"Could not read the CSV: {exc}.")
+    finally:
+        text.detach()
+
+
+def read_xlsx_rows(uploaded_file):
+    """Yield dict rows from the first sheet of an .xlsx file, streaming."""
+    try:
+        workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError):
+        raise serializers.ValidationError("Could not read the XLSX file.")
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else None for cell in next(rows, [])]
+        for values in rows:
+            row = {}
+            for key, value in zip(header, values):
+                if not key or value is None or value == "":
+                    continue
+                if isinstance(value, datetime):
+                    value = value.date()
+                row[key] = value.isoformat() if isinstance(value, date) else value
+            if row:
+                yield row
+    finally:
+        workbook.close()
+
+
+def read_upload_rows(uploaded_file):
+    name = (getattr(uploaded_file, "name", "") or "").lower()
+    if name.endswith(".xlsx"):
+        return read_xlsx_rows(uploaded_file)
+    return read_csv_rows(uploaded_file)
+
+
+class BulkPaymentRowSerializer(serializers.Serializer):
+    member_id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    payment_date = serializers.DateField(required=False)
+    note = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Payment amount must be greater than 0.")
+        return value
+
+
+def import_payments(gym, rows):
+    """
+    Record many payments for `gym` in a fixed number of statements plus one
+    UPDATE per distinct member.
+
+    Returns (payments, errors). `payments` holds the created Payment objects
+    and `errors` is a list of {"row": index, "errors": ...}.
+    """
+    errors = []
+    accepted = []
+
+    for index, row in enumerate(rows):
+        serializer = BulkPaymentRowSerializer(data=row)
+        if serializer.is_valid():
+            accepted.append((index, serializer.validated_data))
+        else:
+            errors.append({"row": index, "errors": serializer.errors})
+
+    members = Member.objects.filter(
+        gym=gym,
+        is_active=True,
+        id__in={data["member_id"] for _, data in accepted},
+    ).in_bulk()
+
+    # Check each member's rows in order against their remaining balance.
+    by_member = defaultdict(list)
+    running_paid = {member_id: member.amount_paid for member_id, member in members.items()}
+    for index, data in accepted:
+        member = members.get(data["member_id"])
+        if member is None:
+            errors.append({"row": index, "errors": {"member_id": ["Member not found."]}})
+            continue
+        if running_paid[member.id] + data["amount"] > member.total_fee:
+            errors.append({"row": index, "errors": {"amount": ["Payment exceeds total fee."]}})
+            continue
+        running_paid[member.id] += data["amount"]
+        by_member[member.id].append((index, data))
+
+    payments = []
+    today = timezone.localdate()
+
+    with transaction.atomic():
+        # In id order, so concurrent imports lock shared members in the same
+        # order and can't deadlock.
+        for member_id in sorted(by_member):
+            member_rows = by_member[member_id]
+            total = sum(data["amount"] for _, data in member_rows)
+            latest = max(data.get("payment_date") or today for _, data in member_rows)
+            if not Member.add_payment(member_id, total, latest):
+                # The balance moved underneath us (a concurrent payment).
+                for index, _ in member_rows:
+                    errors.append({"row": index, "errors": {"amount": ["Payment exceeds total fee."]}})
+                del by_member[member_id]
+
+        ordered = sorted(
+            (item for member_rows in by_member.values() for item in member_rows),
+            key=lambda item: item[0],
+        )
+        if ordered:
+            receipt_numbers = ReceiptSequence.allocate(gym.id, count=len(ordered))
+            payments = Payment.objects.bulk_create(
+                [
+                    Payment(
+                        member=members[data["member_id"]],
+                        gym=gym,
+                        amount=data["amount"],
+                        payment_date=data.get("payment_date") or today,
+                        note=data.get("note", ""),
+                        receipt_number=receipt_number,
+                    )
+                    for (_, data), receipt_number in zip(ordered, receipt_numbers)
+                ],
+                batch_size=500,
+            )
+
+            GymDailyRevenue.record_payments(gym.id, payments)
+
+        if by_member:
+            bump_gym_generation(gym.id)
+
+    errors.sort(key=lambda error: error["row"])
+    return payments, errors
+
+
+def import_members(gym, rows, batch_size=MEMBER_IMPORT_BATCH_SIZE):
+    """
+    Create members for `gym` from an iterable of dict rows.
+
+    Rows go through MemberSerializer validation one at a time and are written
+    with bulk_create every `batch_size` rows, so memory stays bounded by the
+    batch size whatever the size of the input. Each batch commits on its own.
+
+    Returns (created_count, errors, error_count).
+    """
+    created = 0
+    errors = []
+    error_count = 0
+    batch = []
+
+    def flush():
+        nonlocal created
+        with transaction.atomic():
+            Member.objects.bulk_create(batch)
+            bump_gym_generation(gym.id)
+        created += len(batch)
+        batch.clear()
+
+    for index, row in enumerate(rows):
+        serializer = MemberSerializer(data=row)
+        if not serializer.is_valid():
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": index, "errors": serializer.errors})
+            continue
+
+        member = Member(gym=gym, **serializer.validated_data)
+        member.update_payment_status()
+        batch.append(member)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return created, errors, error_count
+
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+LOOKUPS = ("exact", "gt", "gte", "lt", "lte")
+
+
+class MemberBalanceFilter(BaseFilterBackend):
+    """
+    ?remaining_fee__gt=0, ?days_left__lte=7, ... (exact/gt/gte/lt/lte).
+
+    Expects a queryset from MemberQuerySet.with_balances().
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        today = timezone.localdate()
+
+        for lookup in LOOKUPS:
+            for field in ("remaining_fee", "days_left"):
+                key = field if lookup == "exact" else f"{field}__{lookup}"
+                value = params.get(key)
+                if value is None or value == "":
+                    continue
+
+                if field == "remaining_fee":
+                    try:
+                        amount = Decimal(value)
+                    except InvalidOperation:
+                        raise ValidationError({key: "Must be a number."})
+                    if not amount.is_finite():
+                        raise ValidationError({key: "Must be a number."})
+                    queryset = queryset.filter(**{f"remaining_fee__{lookup}": amount})
+                else:
+                    # days_left = end_date - today, so bound end_date instead
+                    # and let the (gym, end_date) index do the work.
+                    try:
+                        end_date = today + timedelta(days=int(value))
+                    except (ValueError, OverflowError):
+                        raise ValidationError({key: "Must be a whole number of days."})
+                    queryset = queryset.filter(**{f"end_date__{lookup}": end_date})
+
+        return queryset
+
+
+class MemberOrderingFilter(OrderingFilter):
+    """OrderingFilter that sorts `days_left` by the indexed `end_date` column."""
+
+    aliases = {"days_left": "end_date"}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self._alias(term) for term in ordering]
+
+    def _alias(self, term):
+        prefix = "-" if term.startswith("-") else ""
+        name = term.lstrip("-")
+        return prefix + self.aliases.get(name, name)
+
@@ -0,0 +1,162 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from random import Random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from gym.models import Gym
+from members.models import Member
+from members.search import match_condition, search_members
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large throwaway gym and report EXPLAIN plans and timings for the "
+        "hot member queries, with and without the partial/search indexes. "
+        "Everything runs in one transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--no-explain", action="store_true")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                gym = self.seed(options["members"])
+                self.analyze()
+
+                self.stdout.write(self.style.MIGRATE_HEADING("With indexes"))
+                with_indexes = self.run_queries(gym, options)
+
+                self.drop_indexes()
+                self.analyze()
+                self.stdout.write(self.style.MIGRATE_HEADING("Without partial/search indexes"))
+                without_indexes = self.run_queries(gym, options)
+
+                self.report(with_indexes, without_indexes)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def seed(self, count):
+        rng = Random(42)
+        owner = get_user_model().objects.create_user(username=f"bench-{time.time_ns()}")
+        gym = Gym.objects.create(owner=owner, name="Benchmark Gym")
+        # A second gym so the gym_id prefix of each index has to do some work.
+        other = Gym.objects.create(owner=owner, name="Other Gym")
+
+        today = timezone.localdate()
+        first_names = ["Aarav", "Vivaan", "Aditya", "Ishaan", "Diya", "Ananya", "Saanvi", "Priya", "Rohan", "Kabir"]
+        statuses = [choice for choice, _ in Member.PaymentStatus.choices]
+
+        started = time.perf_counter()
+        batch = []
+        for i in range(count * 2):
+            total_fee = Decimal(rng.choice([1000, 1500, 2500, 12000]))
+            status = rng.choice(statuses)
+            paid = {"pending": Decimal("0"), "partial": total_fee / 2, "paid": total_fee}[status]
+            batch.append(Member(
+                gym=gym if i % 2 == 0 else other,
+                name=f"{rng.choice(first_names)} {i:06d}",
+                phone=f"9{rng.randrange(10**9):09d}",
+                start_date=today - timedelta(days=rng.randrange(365)),
+                end_date=today + timedelta(days=rng.randrange(-180, 365)),
+                total_fee=total_fee,
+                amount_paid=paid,
+                payment_status=status,
+                # Roughly a third of rows are churned members.
+                is_active=rng.random() > 0.33,
+            ))
+            if len(batch) >= 5000:
+                Member.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Member.objects.bulk_create(batch)
+
+        self.stdout.write(f"Seeded {count * 2} members across 2 gyms in {time.perf_counter() - started:.1f}s "
+                          f"on {connection.vendor}.")
+        return gym
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def drop_indexes(self):
+        names = [index.name for index in Member._meta.indexes if index.condition is not None]
+        if connection.vendor == "postgresql":
+            migration = import_module("members.migrations.0006_active_member_indexes_squashed_0007_member_search")
+            names += [name for name, _ in migration.SEARCH_INDEXES]
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def queries(self, gym):
+        """label -> (queryset, how to evaluate it), mirroring the API's query shapes."""
+        today = timezone.localdate()
+        active = Member.objects.filter(gym=gym, is_active=True)
+        page = list
+        return {
+            "list by end_date": (active.order_by("end_date", "id")[:50], page),
+            "expiring in 7 days": (
+                active.filter(end_date__gte=today, end_date__lte=today + timedelta(days=7))
+                .order_by("end_date", "id")[:50],
+                page,
+            ),
+            "list by name": (active.order_by("name", "id")[:50], page),
+            "pending count": (
+                active.filter(payment_status__in=[Member.PaymentStatus.PENDING, Member.PaymentStatus.PARTIAL]),
+                lambda qs: qs.count(),
+            ),
+            "search name": (active.filter(name__icontains="aditya 0012").order_by("end_date", "id")[:50], page),
+            "search phone": (active.filter(phone__icontains="98765").order_by("end_date", "id")[:50], page),
+            "typeahead": (
+                active.filter(match_condition("adit", connection.vendor, substring=False)),
+                lambda qs: search_members(active, "adit"),
+            ),
+            "revenue summary": (
+                active,
+                lambda qs: qs.aggregate(
+                    total=Sum("total_fee"),
+                    pending=Count("id", filter=Q(payment_status=Member.PaymentStatus.PENDING)),
+                ),
+            ),
+        }
+
+    def run_queries(self, gym, options):
+        timings = {}
+        for label, (queryset, evaluate) in self.queries(gym).items():
+            # .all() gives a fresh clone each time so nothing is served from the result cache.
+            evaluate(queryset.all())
+            samples = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                evaluate(queryset.all())
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[label] = statistics.median(samples)
+
+            self.stdout.write(f"  {label}: {timings[label]:.2f} ms (median of {options['repeat']})")
+            if not options["no_explain"]:
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f"      {line}")
+        return timings
+
+    def report(self, with_indexes, without_indexes):
+        self.stdout.write(self.style.MIGRATE_HEADING("Summary (median ms)"))
+        self.stdout.write(f"  {'query':<22}{'without':>10}{'with':>10}{'speedup':>10}")
+        for label, fast in with_indexes.items():
+            slow = without_indexes[label]
+            speedup = slow / fast if fast else float("inf")
+            self.stdout.write(f"  {label:<22}{slow:>10.2f}{fast:>10.2f}{speedup:>9.1f}x")
@@ -0,0 +1,202 @@
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from gym.caching import response_cache_enabled
+from gym.models import Gym
+
+
+READ_PATHS = (
+    "/api/gyms/{gym_id}/dashboard/revenue-summary/",
+    "/api/gyms/{gym_id}/members/expiring/?days=30",
+    "/api/gyms/{gym_id}/payments/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the dashboard read endpoints served by gunicorn sync workers "
+        "(gymmm.wsgi) and by uvicorn workers (gymmm.asgi with ASYNC_READ_VIEWS), "
+        "and report throughput, latency and resident memory for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gym", required=True, help="Gym id to read; its owner's token is used.")
+        parser.add_argument("--path", action="append", dest="paths",
+                            help="Path to request (repeatable; {gym_id} is filled in). Default: the dashboard reads.")
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--duration", type=float, default=20.0)
+        parser.add_argument("--warmup", type=float, default=3.0)
+        parser.add_argument("--wsgi-workers", type=int, default=4)
+        parser.add_argument("--asgi-workers", type=int, default=1)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--cached", action="store_true",
+                            help="Keep the response cache on (by default every request reaches the database). "
+                                 "Needs a shared cache (REDIS_URL).")
+
+    def handle(self, *args, **options):
+        if options["cached"] and not response_cache_enabled():
+            raise CommandError("--cached needs RESPONSE_CACHE_ALIAS to name a shared cache (set REDIS_URL).")
+        for module in ("gunicorn", "uvicorn"):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is not installed.")
+
+        gym = Gym.objects.select_related("owner").filter(id=options["gym"]).first()
+        if gym is None:
+            raise CommandError("Gym not found.")
+        token = str(AccessToken.for_user(gym.owner))
+        paths = [path.format(gym_id=gym.id) for path in options["paths"] or READ_PATHS]
+
+        servers = [
+            ("WSGI", ["gymmm.wsgi:application", "--workers", str(options["wsgi_workers"])], {}),
+            ("ASGI", [
+                "gymmm.asgi:application", "--workers", str(options["asgi_workers"]),
+                "--worker-class", "uvicorn.workers.UvicornWorker",
+            ], {"ASYNC_READ_VIEWS": "1"}),
+        ]
+
+        results = []
+        for label, server_args, env in servers:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label}: {' '.join(server_args)}"))
+            if not options["cached"]:
+                env = {**env, "RESPONSE_CACHE_TTL": "0"}
+            result = self.run_server(server_args, env, token, paths, options)
+            self.stdout.write(self.format_result(result))
+            results.append((label, result))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Throughput per 100 MB resident"))
+        for label, result in results:
+            per_100mb = result["rps"] / (result["rss_mb"] / 100) if result["rss_mb"] else 0
+            self.stdout.write(f"  {label:<5} {per_100mb:8.1f} req/s")
+
+    def run_server(self, server_args, env, token, paths, options):
+        port = options["port"]
+        command = [
+            sys.executable, "-m", "gunicorn", *server_args,
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+        ]
+        process = subprocess.Popen(
+            command,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **env},
+        )
+        try:
+            self.wait_for_port(port, process)
+            drive_load(port, token, paths, options["concurrency"], options["warmup"])
+
+            peak_rss = 0
+            stop = threading.Event()
+
+            def sample():
+                nonlocal peak_rss
+                while not stop.wait(0.5):
+                    peak_rss = max(peak_rss, tree_rss_kb(process.pid))
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            latencies, errors, elapsed = drive_load(port, token, paths, options["concurrency"], options["duration"])
+            stop.set()
+            sampler.join()
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": len(latencies) / elapsed,
+            "p50": statistics.median(latencies) if latencies else 0,
+            "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            "rss_mb": peak_rss / 1024,
+        }
+
+    def wait_for_port(self, port, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError("Server exited during startup.")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Server did not listen on port {port} within {timeout}s.")
+
+    def format_result(self, result):
+        return (
+            f"  {result['requests']} requests, {result['errors']} errors, "
+            f"{result['rps']:.1f} req/s, p50 {result['p50'] * 1000:.1f} ms, "
+            f"p95 {result['p95'] * 1000:.1f} ms, peak RSS {result['rss_mb']:.0f} MB"
+        )
+
+
+def drive_load(port, token, paths, concurrency, duration):
+    """`concurrency` keep-alive clients cycling through `paths` for `duration` seconds."""
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client(offset):
+        nonlocal errors
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, failed = [], 0
+        i = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", paths[i % len(paths)], headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status == 200:
+                    mine.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            i += 1
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.monotonic() - started
+
+
+def tree_rss_kb(pid):
+    """Resident memory of `pid` and all its descendants, from /proc (Linux only)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            for line in Path(f"/proc/{current}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+                    break
+            for task in Path(f"/proc/{current}/task").iterdir():
+                pending.extend(int(child) for child in (task / "children").read_text().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
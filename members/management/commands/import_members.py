@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from gym.models import Gym
+from members.bulk import MEMBER_IMPORT_BATCH_SIZE, import_members, read_upload_rows
+
+
+class Command(BaseCommand):
+    help = "Import members into a gym from a CSV or XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("gym_id")
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=MEMBER_IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        gym = Gym.objects.filter(id=options["gym_id"]).first()
+        if not gym:
+            raise CommandError("Gym not found.")
+
+        with open(options["path"], "rb") as f:
+            try:
+                created, errors, error_count = import_members(
+                    gym,
+                    read_upload_rows(f),
+                    batch_size=options["batch_size"],
+                )
+            except ValidationError as exc:
+                # Raised by the file readers, e.g. for a CSV that isn't UTF-8.
+                raise CommandError(" ".join(map(str, exc.detail)))
+
+        for error in errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if error_count > len(errors):
+            self.stderr.write(f"... and {error_count - len(errors)} more invalid row(s)")
+
+        self.stdout.write(f"Imported {created} member(s) into {gym.name}; {error_count} row(s) skipped.")
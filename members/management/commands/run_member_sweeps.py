@@ -0,0 +1,50 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gym.models import Gym
+from members.sweeps import SWEEP_BATCH_SIZE, sweep_gym
+
+
+class Command(BaseCommand):
+    help = "Expire lapsed memberships for every gym."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gym", dest="gym_id", help="Sweep only this gym.")
+        parser.add_argument("--batch-size", type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument("--daily", action="store_true",
+                            help="Keep running and sweep again after each local midnight.")
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep_all(options)
+            if not options["daily"]:
+                return
+            time.sleep(self.seconds_until_tomorrow())
+
+    def sweep_all(self, options):
+        gyms = Gym.objects.order_by("id")
+        if options["gym_id"]:
+            gyms = gyms.filter(id=options["gym_id"])
+
+        today = timezone.localdate()
+        failed = 0
+        for gym_id in gyms.values_list("id", flat=True).iterator():
+            try:
+                run = sweep_gym(gym_id, today=today, batch_size=options["batch_size"])
+            except Exception as exc:
+                # One bad gym shouldn't hold up everyone else's sweep.
+                failed += 1
+                self.stderr.write(f"gym {gym_id}: sweep failed: {exc!r}")
+                continue
+            self.stdout.write(f"gym {gym_id}: expired {run.expired_count} in {run.duration_ms} ms")
+
+        if failed:
+            self.stderr.write(f"{failed} gym(s) failed; they will be retried on the next run.")
+
+    def seconds_until_tomorrow(self):
+        now = timezone.localtime()
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo)
+        return max((tomorrow - now).total_seconds(), 1)
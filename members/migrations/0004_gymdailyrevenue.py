@@ -0,0 +1,55 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:57
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_daily_revenue(apps, schema_editor):
+    Payment = apps.get_model("members", "Payment")
+    GymDailyRevenue = apps.get_model("members", "GymDailyRevenue")
+
+    rows = (
+        Payment.objects
+        .values("gym_id", "payment_date")
+        .annotate(collected=models.Sum("amount"), payments_count=models.Count("id"))
+        .order_by()
+    )
+    GymDailyRevenue.objects.bulk_create(
+        (
+            GymDailyRevenue(
+                gym_id=row["gym_id"],
+                date=row["payment_date"],
+                collected=row["collected"],
+                payments_count=row["payments_count"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0001_initial'),
+        ('members', '0003_payment_member_amount_paid_member_last_payment_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymDailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('collected', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('payments_count', models.PositiveIntegerField(default=0)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenue', to='gym.gym')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('gym', 'date'), name='uniq_gym_daily_revenue')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_revenue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:08
+
+import sys
+
+import django.db.models.functions.text
+from django.db import DatabaseError, migrations, models, transaction
+
+
+# PostgreSQL only: a trigram index serves members.search's substring match
+# (search_name LIKE '%term%'). CREATE EXTENSION pg_trgm needs a superuser or
+# the database owner. Without it the migration still succeeds, only without
+# this index, and substring searches scan the gym's members; a DBA can
+# install the extension and run the printed CREATE INDEX later.
+SEARCH_INDEXES = [
+    ("member_search_name_trgm_idx", "USING gin (search_name gin_trgm_ops)"),
+]
+
+
+def _create_index_sql(name, definition):
+    return f"CREATE INDEX IF NOT EXISTS {name} ON members_member {definition} WHERE is_active"
+
+
+def _enable_pg_trgm(schema_editor):
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as exc:
+        sys.stderr.write(
+            f"\n  Skipped the member search trigram index: pg_trgm could not be enabled ({exc})."
+            "\n  As a superuser, run CREATE EXTENSION pg_trgm; then:\n"
+            + "".join(f"    {_create_index_sql(name, definition)};\n" for name, definition in SEARCH_INDEXES)
+        )
+        return False
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql" or not _enable_pg_trgm(schema_editor):
+        return
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(_create_index_sql(name, definition))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('members', '0006_active_member_indexes'),
+        ('members', '0007_member_search'),
+    ]
+
+    dependencies = [
+        ('gym', '0001_initial'),
+        ('members', '0005_receiptsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gym', 'end_date', 'id'], name='member_active_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gym', 'payment_status', 'end_date'], name='member_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gym', 'name', 'id'], name='member_active_name_idx'),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='phone_digits',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(models.F('phone'), models.Value('+')), models.Value(' ')), models.Value('-')), models.Value('(')), models.Value(')')), output_field=models.CharField(max_length=15)),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='phone_reversed',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Reverse(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(models.F('phone'), models.Value('+')), models.Value(' ')), models.Value('-')), models.Value('(')), models.Value(')'))), output_field=models.CharField(max_length=15)),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='search_name',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower('name'), output_field=models.CharField(max_length=255)),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gym', 'search_name'], name='member_search_name_idx', opclasses=['uuid_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gym', 'phone_digits'], name='member_search_phone_idx', opclasses=['uuid_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gym', 'phone_reversed'], name='member_search_phone_rev_idx', opclasses=['uuid_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
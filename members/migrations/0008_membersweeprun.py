@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0001_initial'),
+        ('members', '0006_active_member_indexes_squashed_0007_member_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSweepRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_date', models.DateField()),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expired_count', models.PositiveIntegerField(default=0)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sweep_runs', to='gym.gym')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['gym', '-started_at'], name='members_mem_gym_id_6ed848_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym', '0001_initial'),
+        ('members', '0008_membersweeprun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipRenewal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan', models.CharField(choices=[('monthly', 'Monthly'), ('yearly', 'Yearly')], max_length=20)),
+                ('previous_end_date', models.DateField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('carried_over', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('renewed_at', models.DateTimeField(auto_now_add=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renewals', to='gym.gym')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renewals', to='members.member')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='renewals', to='members.payment')),
+            ],
+            options={
+                'ordering': ['-renewed_at', '-id'],
+                'indexes': [models.Index(fields=['member', 'renewed_at'], name='members_mem_member__3a8c19_idx'), models.Index(fields=['gym', 'renewed_at'], name='members_mem_gym_id_418a9e_idx')],
+            },
+        ),
+    ]
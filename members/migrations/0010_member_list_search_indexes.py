@@ -0,0 +1,58 @@
+import sys
+
+from django.db import DatabaseError, migrations, transaction
+
+
+# PostgreSQL only: trigram indexes for the member list's ?search= (DRF's
+# SearchFilter), which matches UPPER(field::text) LIKE UPPER('%term%') on
+# each of these fields, ORed together. Every branch needs an index for the
+# planner to combine them; one unindexed field and it scans the gym's members.
+SEARCH_FIELDS = ["name", "phone", "course_taken", "offer_taken"]
+SEARCH_INDEXES = [
+    (f"member_list_search_{field}_trgm_idx", f"USING gin ((UPPER({field}::text)) gin_trgm_ops)")
+    for field in SEARCH_FIELDS
+]
+
+
+def _create_index_sql(name, definition):
+    return f"CREATE INDEX IF NOT EXISTS {name} ON members_member {definition} WHERE is_active"
+
+
+def _enable_pg_trgm(schema_editor):
+    # As in 0006: without pg_trgm the migration succeeds without the indexes.
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as exc:
+        sys.stderr.write(
+            f"\n  Skipped the member list search indexes: pg_trgm could not be enabled ({exc})."
+            "\n  As a superuser, run CREATE EXTENSION pg_trgm; then:\n"
+            + "".join(f"    {_create_index_sql(name, definition)};\n" for name, definition in SEARCH_INDEXES)
+        )
+        return False
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql" or not _enable_pg_trgm(schema_editor):
+        return
+    for name, definition in SEARCH_INDEXES:
+        schema_editor.execute(_create_index_sql(name, definition))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0009_membershiprenewal'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
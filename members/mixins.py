@@ -0,0 +1,52 @@
+from rest_framework.exceptions import NotFound
+
+from gym.models import Gym
+from .models import Member
+
+
+class GymScopedMixin:
+    """
+    Resolves the gym (and member) from the URL once per request.
+
+    Every lookup is scoped to `request.user` as owner. The member lookup joins
+    the gym and its ownership check into a single query, and the result is
+    memoized on the view so get_queryset(), get_serializer_context() and
+    permission checks all reuse the same objects.
+    """
+
+    # Payments and reminders only make sense for active members; the
+    # detail/delete views also need to reach inactive ones.
+    member_active_only = True
+
+    def get_gym(self):
+        if not hasattr(self, "_gym"):
+            gym = Gym.objects.filter(id=self.kwargs["gym_id"], owner=self.request.user).first()
+            if not gym:
+                raise NotFound("Gym not found.")
+            self._gym = gym
+        return self._gym
+
+    def get_member(self):
+        if not hasattr(self, "_member"):
+            members = Member.objects.select_related("gym").filter(
+                id=self.kwargs["member_id"],
+                gym_id=self.kwargs["gym_id"],
+                gym__owner=self.request.user,
+            )
+            if self.member_active_only:
+                members = members.filter(is_active=True)
+
+            member = members.first()
+            if not member:
+                # Only on the miss path: tell "wrong gym" apart from "wrong member".
+                self.get_gym()
+                raise NotFound("Member not found.")
+
+            self._member = member
+            self._gym = member.gym
+        return self._member
+
+    def get_object(self):
+        member = self.get_member()
+        self.check_object_permissions(self.request, member)
+        return member
@@ -1,9 +1,59 @@
+from collections import defaultdict
 from decimal import Decimal
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Greatest, Lower, Replace, Reverse
 from django.utils import timezone
 from gym.models import Gym
 
 
+class DaysUntil(models.Func):
+    """Whole days from `date` until the date expression (negative once past)."""
+
+    output_field = models.IntegerField()
+
+    def __init__(self, expression, date, **extra):
+        super().__init__(expression, models.Value(date, output_field=models.DateField()), **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # PostgreSQL: date - date is already an integer number of days.
+        return super().as_sql(compiler, connection, template="(%(expressions)s)", arg_joiner=" - ", **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function="DATEDIFF", **extra_context)
+
+
+def _phone_digits(expression):
+    """`expression` with the usual phone punctuation stripped out."""
+    for char in ("+", " ", "-", "(", ")"):
+        expression = Replace(expression, models.Value(char))
+    return expression
+
+
+class MemberQuerySet(models.QuerySet):
+    def with_balances(self):
+        """
+        Annotate `days_left` and `remaining_fee` in SQL so they can be filtered
+        and sorted on; the model properties of the same name return these
+        values when present instead of recomputing them.
+        """
+        return self.annotate(
+            days_left=DaysUntil("end_date", timezone.localdate()),
+            remaining_fee=Greatest(
+                models.F("total_fee") - models.F("amount_paid"),
+                models.Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        )
+
+
 class Member(models.Model):
 
     class PlanType(models.TextChoices):
@@ -49,11 +99,72 @@ class Member(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Normalized copies of name/phone for members.search. The database keeps
+    # them in sync, so bulk_create and queryset updates can't leave them stale.
+    search_name = models.GeneratedField(
+        expression=Lower("name"),
+        output_field=models.CharField(max_length=255),
+        db_persist=True,
+    )
+    phone_digits = models.GeneratedField(
+        expression=_phone_digits(models.F("phone")),
+        output_field=models.CharField(max_length=15),
+        db_persist=True,
+    )
+    # Reversed so "last four digits" lookups are a prefix match on an index.
+    phone_reversed = models.GeneratedField(
+        expression=Reverse(_phone_digits(models.F("phone"))),
+        output_field=models.CharField(max_length=15),
+        db_persist=True,
+    )
+
+    objects = MemberQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=["gym", "end_date"]),
             models.Index(fields=["gym", "name"]),
             models.Index(fields=["gym", "payment_status"]),
+            # Nearly every query is scoped to active members; these skip
+            # inactive rows entirely and end in `id` for keyset pagination.
+            # The trigram search indexes are PostgreSQL-only and live in
+            # migrations 0006_active_member_indexes_squashed_0007_member_search
+            # (typeahead) and 0010_member_list_search_indexes (list ?search=).
+            models.Index(
+                fields=["gym", "end_date", "id"],
+                condition=models.Q(is_active=True),
+                name="member_active_end_date_idx",
+            ),
+            models.Index(
+                fields=["gym", "payment_status", "end_date"],
+                condition=models.Q(is_active=True),
+                name="member_active_status_idx",
+            ),
+            models.Index(
+                fields=["gym", "name", "id"],
+                condition=models.Q(is_active=True),
+                name="member_active_name_idx",
+            ),
+            # Prefix lookups for members.search. The opclasses let PostgreSQL
+            # use them for LIKE 'term%'; other backends ignore them.
+            models.Index(
+                fields=["gym", "search_name"],
+                condition=models.Q(is_active=True),
+                opclasses=["uuid_ops", "varchar_pattern_ops"],
+                name="member_search_name_idx",
+            ),
+            models.Index(
+                fields=["gym", "phone_digits"],
+                condition=models.Q(is_active=True),
+                opclasses=["uuid_ops", "varchar_pattern_ops"],
+                name="member_search_phone_idx",
+            ),
+            models.Index(
+                fields=["gym", "phone_reversed"],
+                condition=models.Q(is_active=True),
+                opclasses=["uuid_ops", "varchar_pattern_ops"],
+                name="member_search_phone_rev_idx",
+            ),
         ]
         ordering = ["end_date"]
 
@@ -62,13 +173,27 @@ class Member(models.Model):
 
     @property
     def days_left(self):
+        if "_days_left" in self.__dict__:
+            return self._days_left
         return (self.end_date - timezone.localdate()).days
 
+    @days_left.setter
+    def days_left(self, value):
+        # Set by MemberQuerySet.with_balances().
+        self._days_left = value
+
     @property
     def remaining_fee(self):
+        if "_remaining_fee" in self.__dict__:
+            return self._remaining_fee
         remaining = self.total_fee - self.amount_paid
         return remaining if remaining > 0 else Decimal("0.00")
 
+    @remaining_fee.setter
+    def remaining_fee(self, value):
+        # SQLite evaluates decimal expressions in floating point.
+        self._remaining_fee = value.quantize(Decimal("0.01")) if value is not None else value
+
     def update_payment_status(self):
         if self.amount_paid <= 0:
             self.payment_status = self.PaymentStatus.PENDING
@@ -77,6 +202,34 @@ class Member(models.Model):
         else:
             self.payment_status = self.PaymentStatus.PAID
 
+    @classmethod
+    def add_payment(cls, member_id, amount, payment_date):
+        """
+        Atomically add `amount` to the member's `amount_paid` in one UPDATE.
+
+        The overshoot check, the new payment_status and last_payment_date are
+        all evaluated by the database against the row's current values, so
+        concurrent payments can neither lose an update nor exceed total_fee.
+        Returns False (and changes nothing) if the payment would overshoot.
+        """
+        new_paid = models.F("amount_paid") + amount
+        updated = cls.objects.filter(
+            pk=member_id,
+            total_fee__gte=new_paid,
+        ).update(
+            amount_paid=new_paid,
+            payment_status=models.Case(
+                models.When(total_fee__lte=new_paid, then=models.Value(cls.PaymentStatus.PAID)),
+                default=models.Value(cls.PaymentStatus.PARTIAL),
+            ),
+            last_payment_date=models.Case(
+                models.When(last_payment_date__gt=payment_date, then=models.F("last_payment_date")),
+                default=models.Value(payment_date),
+            ),
+            updated_at=timezone.now(),
+        )
+        return bool(updated)
+
 
 class Payment(models.Model):
     member = models.ForeignKey(
@@ -105,4 +258,163 @@ class Payment(models.Model):
         ordering = ["-payment_date", "-id"]
 
     def __str__(self):
-        return f"{self.member.name} - {self.amount}"
\ No newline at end of file
+        return f"{self.member.name} - {self.amount}"
+
+
+class GymDailyRevenue(models.Model):
+    """
+    Money collected per gym per day, maintained incrementally as payments are
+    recorded so revenue reports read O(days) rows instead of scanning Payment.
+    """
+    gym = models.ForeignKey(
+        Gym,
+        on_delete=models.CASCADE,
+        related_name="daily_revenue"
+    )
+    date = models.DateField()
+    collected = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    payments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["gym", "date"], name="uniq_gym_daily_revenue"),
+        ]
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.gym_id} {self.date}: {self.collected}"
+
+    @classmethod
+    def record(cls, gym_id, date, amount, payments=0):
+        """Add `amount` (may be negative) to the gym's row for `date`."""
+        if not amount and not payments:
+            return
+
+        def bump():
+            return cls.objects.filter(gym_id=gym_id, date=date).update(
+                collected=models.F("collected") + amount,
+                payments_count=models.F("payments_count") + payments,
+            )
+
+        if bump():
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(gym_id=gym_id, date=date, collected=amount, payments_count=payments)
+        except IntegrityError:
+            # Another request created the row first.
+            bump()
+
+    @classmethod
+    def record_payments(cls, gym_id, payments):
+        """record() a batch of the gym's new payments, one update per payment date."""
+        collected = defaultdict(lambda: [0, 0])
+        for payment in payments:
+            collected[payment.payment_date][0] += payment.amount
+            collected[payment.payment_date][1] += 1
+        for day, (amount, count) in collected.items():
+            cls.record(gym_id, day, amount, payments=count)
+
+
+class ReceiptSequence(models.Model):
+    """
+    Monotonic receipt counter per receipt prefix.
+
+    The prefix is the first 6 hex digits of the gym id, the same ones
+    receipts have always shown. Gyms that happen to share a prefix share
+    a counter, which keeps `Payment.receipt_number` globally unique. Only
+    gyms with the same prefix ever wait on each other's row lock.
+    """
+    prefix = models.CharField(max_length=20, primary_key=True)
+    last_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+    @staticmethod
+    def prefix_for(gym_id):
+        return gym_id.hex[:6].upper()
+
+    @classmethod
+    def allocate(cls, gym_id, count=1):
+        """
+        Reserve `count` consecutive receipt numbers for the gym.
+
+        The row stays locked until the caller's transaction commits. If that
+        transaction rolls back, the numbers are handed out again, so receipts
+        have no gaps from failed payments. Gaps are tolerated anyway.
+        """
+        prefix = cls.prefix_for(gym_id)
+        sequences = cls.objects.filter(prefix=prefix)
+
+        with transaction.atomic():
+            if not sequences.update(last_value=models.F("last_value") + count):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefix=prefix, last_value=count)
+                except IntegrityError:
+                    sequences.update(last_value=models.F("last_value") + count)
+            last = sequences.values_list("last_value", flat=True).get()
+
+        return [f"RCPT-{prefix}-{n:06d}" for n in range(last - count + 1, last + 1)]
+
+
+
+class MemberSweepRun(models.Model):
+    """Statistics for one gym's pass of `run_member_sweeps`."""
+
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name="sweep_runs")
+    run_date = models.DateField()
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(blank=True, null=True)
+    expired_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["gym", "-started_at"]),
+        ]
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"{self.gym_id} {self.run_date}"
+
+    @property
+    def duration_ms(self):
+        if self.finished_at is None:
+            return None
+        return int((self.finished_at - self.started_at).total_seconds() * 1000)
+
+
+class MembershipRenewal(models.Model):
+    """One renewal of a member's plan, kept as history."""
+
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="renewals")
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name="renewals")
+    plan = models.CharField(max_length=20, choices=Member.PlanType.choices)
+
+    previous_end_date = models.DateField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    fee = models.DecimalField(max_digits=10, decimal_places=2)
+    # Unpaid balance from the previous period, added to the new total_fee.
+    carried_over = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    payment = models.ForeignKey(
+        Payment,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="renewals",
+    )
+
+    renewed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["member", "renewed_at"]),
+            models.Index(fields=["gym", "renewed_at"]),
+        ]
+        ordering = ["-renewed_at", "-id"]
+
+    def __str__(self):
+        return f"{self.member_id}: {self.start_date} - {self.end_date}"
@@ -0,0 +1,156 @@
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, Cursor
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination that seeks on the full ordering plus an `id` tiebreaker.
+
+    DRF's CursorPagination only remembers the first ordering field and skips
+    duplicates with an OFFSET, which gets slow when many rows share a value
+    (lots of members expire on the same day). Here the cursor stores every
+    ordering value plus the id, so each page is a plain index range scan:
+
+        WHERE (end_date, id) > (:end_date, :id) ORDER BY end_date, id LIMIT n
+
+    Ordering fields must be non-nullable model fields (or annotations).
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("end_date",)
+    tiebreaker = "id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views: the page is fetched with async iteration."""
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The (unevaluated) query for the requested page plus one look-ahead row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            self._reverse, self._position = False, None
+        else:
+            self._reverse, self._position = self.cursor.reverse, self.decode_position(self.cursor.position)
+
+        ordering = self.ordering
+        if self._reverse:
+            ordering = tuple(_invert(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self._position is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, self._position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self._reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            self.has_next = self._position is not None
+        else:
+            self.has_next = has_more
+            self.has_previous = self._position is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        fields = [field.lstrip("-") for field in ordering]
+        if self.tiebreaker in fields:
+            return ordering[:fields.index(self.tiebreaker) + 1]
+
+        # The tiebreaker follows the direction of the primary sort so the
+        # composite key can still be served by a single index scan.
+        prefix = "-" if ordering[0].startswith("-") else ""
+        return ordering + (prefix + self.tiebreaker,)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self.encode_position(self.page[-1])
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self.encode_position(self.page[0])
+        elif self.cursor is not None:
+            # Empty page past the end: everything before the cursor is still reachable.
+            position = self.cursor.position
+        else:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def encode_position(self, instance):
+        values = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif not isinstance(value, (int, str)):
+                value = str(value)
+            values.append(value)
+        return json.dumps(values, separators=(",", ":"))
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            # Cursor was built for a different ?ordering=.
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _seek_filter(self, ordering, values):
+        """
+        Row-value comparison `(a, b, c) > (x, y, z)` expanded into
+        `a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)`,
+        honouring per-field direction.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+def _invert(field):
+    return field[1:] if field.startswith("-") else "-" + field
+
+
+class PaymentCursorPagination(KeysetCursorPagination):
+    """Newest first, seeking on the (gym, payment_date) index."""
+
+    ordering = ("-payment_date",)
+
@@ -0,0 +1,53 @@
+"""
+WhatsApp reminder messages and wa.me links for the batch reminder endpoint.
+The single-member endpoint builds its own message and link.
+
+Message templates are bound `str.format` methods built once at import, and
+phone numbers come from Member.phone_digits (already normalized in the
+database), so building a reminder is string work only.
+"""
+from urllib.parse import quote
+
+
+WHATSAPP_URL = "https://wa.me/{phone}?text={text}".format
+DEFAULT_COUNTRY_CODE = "91"
+
+DUES_MESSAGE = (
+    "Hello {name}, your fee payment is pending.\n"
+    "Total Fee: ₹{total_fee:.2f}\n"
+    "Paid: ₹{amount_paid:.2f}\n"
+    "Remaining: ₹{remaining_fee:.2f}\n"
+    "Please clear the balance. Thank you."
+).format
+
+RENEWAL_MESSAGE = (
+    "Hello {name}, your membership ends on {end_date:%d %b %Y}.\n"
+    "Please renew to keep training with us. Thank you."
+).format
+
+
+def whatsapp_phone(digits):
+    """wa.me wants the number with country code and no punctuation."""
+    if len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    if len(digits) == 10:
+        return DEFAULT_COUNTRY_CODE + digits
+    return digits
+
+
+def reminder_message(member):
+    """The dues reminder while anything is owed, otherwise a renewal nudge."""
+    if member.remaining_fee > 0:
+        return DUES_MESSAGE(
+            name=member.name,
+            total_fee=member.total_fee,
+            amount_paid=member.amount_paid,
+            remaining_fee=member.remaining_fee,
+        )
+    return RENEWAL_MESSAGE(name=member.name, end_date=member.end_date)
+
+
+def whatsapp_link(phone_digits, message):
+    if not phone_digits:
+        return None
+    return WHATSAPP_URL(phone=whatsapp_phone(phone_digits), text=quote(message))
@@ -0,0 +1,180 @@
+"""
+Membership renewals.
+
+A renewal starts a new billing period for the member:
+
+- it starts at the old end_date, or today if that has already passed
+- it runs one plan length (Member.PlanType)
+- it charges `fee`, which defaults to the member's last renewal fee, or
+  else their current total_fee
+
+Any unpaid balance from the old period is carried into the new total_fee.
+Lapsed members are reactivated. An optional payment is recorded in the same
+transaction, and every renewal leaves a MembershipRenewal history row.
+"""
+import calendar
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from rest_framework import serializers
+
+from gym.caching import bump_gym_generation
+
+from .models import GymDailyRevenue, Member, MembershipRenewal, Payment, ReceiptSequence
+
+
+BULK_RENEWAL_MAX_ROWS = 5000
+
+PLAN_MONTHS = {
+    Member.PlanType.MONTHLY: 1,
+    Member.PlanType.YEARLY: 12,
+}
+
+
+def add_months(day, months):
+    """`day` moved by whole months, clamped to the end of shorter months."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def renewal_period(member, plan, today):
+    start = max(member.end_date, today)
+    return start, add_months(start, PLAN_MONTHS[plan])
+
+
+class RenewalRowSerializer(serializers.Serializer):
+    member_id = serializers.IntegerField()
+    plan = serializers.ChoiceField(choices=Member.PlanType.choices, required=False)
+    fee = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0"), required=False)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    payment_date = serializers.DateField(required=False)
+    note = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Payment amount must be greater than 0.")
+        return value
+
+
+def renew_members(gym, rows, today=None):
+    """
+    Renew many of `gym`'s members in a fixed number of queries.
+
+    Returns (renewals, errors) like import_payments. Each renewal has its
+    `member` (and `payment`, if any) attached.
+    """
+    today = today or timezone.localdate()
+    errors = []
+    accepted = []
+
+    for index, row in enumerate(rows):
+        serializer = RenewalRowSerializer(data=row)
+        if serializer.is_valid():
+            accepted.append((index, serializer.validated_data))
+        else:
+            errors.append({"row": index, "errors": serializer.errors})
+
+    renewals = []
+    with transaction.atomic():
+        last_fee = (
+            MembershipRenewal.objects
+            .filter(member=OuterRef("pk"))
+            .order_by("-renewed_at", "-id")
+            .values("fee")[:1]
+        )
+        members = (
+            Member.objects
+            .select_for_update()
+            .filter(gym=gym, id__in={data["member_id"] for _, data in accepted})
+            # In id order, like import_payments, so concurrent bulk writes
+            # lock shared members in the same order.
+            .order_by("id")
+            .annotate(last_renewal_fee=Subquery(last_fee))
+            .in_bulk()
+        )
+
+        now = timezone.now()
+        renewed = set()
+        for index, data in accepted:
+            member = members.get(data["member_id"])
+            if member is None:
+                errors.append({"row": index, "errors": {"member_id": ["Member not found."]}})
+                continue
+            if member.id in renewed:
+                errors.append({"row": index, "errors": {"member_id": ["Member is renewed more than once."]}})
+                continue
+
+            plan = data.get("plan", member.plan)
+            fee = data.get("fee", member.last_renewal_fee if member.last_renewal_fee is not None else member.total_fee)
+            carried_over = max(member.total_fee - member.amount_paid, Decimal("0.00"))
+            amount = data.get("amount")
+            if amount is not None and amount > fee + carried_over:
+                errors.append({"row": index, "errors": {"amount": ["Payment exceeds total fee."]}})
+                continue
+
+            start_date, end_date = renewal_period(member, plan, today)
+            renewal = MembershipRenewal(
+                member=member,
+                gym=gym,
+                plan=plan,
+                previous_end_date=member.end_date,
+                start_date=start_date,
+                end_date=end_date,
+                fee=fee,
+                carried_over=carried_over,
+            )
+
+            member.plan = plan
+            member.start_date = start_date
+            member.end_date = end_date
+            member.total_fee = fee + carried_over
+            member.amount_paid = amount or Decimal("0.00")
+            member.is_active = True
+            member.updated_at = now
+            member.update_payment_status()
+
+            if amount is not None:
+                payment_date = data.get("payment_date") or today
+                if member.last_payment_date is None or member.last_payment_date < payment_date:
+                    member.last_payment_date = payment_date
+                renewal.payment = Payment(
+                    member=member,
+                    gym=gym,
+                    amount=amount,
+                    payment_date=payment_date,
+                    note=data.get("note", ""),
+                )
+
+            renewed.add(member.id)
+            renewals.append((index, renewal))
+
+        if not renewals:
+            errors.sort(key=lambda error: error["row"])
+            return [], errors
+
+        Member.objects.bulk_update(
+            [renewal.member for _, renewal in renewals],
+            [
+                "plan", "start_date", "end_date", "total_fee", "amount_paid",
+                "payment_status", "last_payment_date", "is_active", "updated_at",
+            ],
+            batch_size=500,
+        )
+
+        payments = [renewal.payment for _, renewal in renewals if renewal.payment is not None]
+        if payments:
+            receipt_numbers = ReceiptSequence.allocate(gym.id, count=len(payments))
+            for payment, receipt_number in zip(payments, receipt_numbers):
+                payment.receipt_number = receipt_number
+            Payment.objects.bulk_create(payments, batch_size=500)
+
+            GymDailyRevenue.record_payments(gym.id, payments)
+
+        renewals = MembershipRenewal.objects.bulk_create([renewal for _, renewal in renewals], batch_size=500)
+        bump_gym_generation(gym.id)
+
+    errors.sort(key=lambda error: error["row"])
+    return renewals, errors
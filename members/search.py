@@ -0,0 +1,104 @@
+"""
+Front-desk member search over the normalized columns on Member, behind the
+members/search/ typeahead. The member list's ?search= stays on DRF's
+SearchFilter (any term, any of name/phone/course/offer), which on PostgreSQL
+is served by the UPPER(...) trigram indexes from migration 0010.
+
+Matching only ever uses indexed shapes:
+
+- name prefix: `search_name` (lowercased name) starts with the term
+- phone prefix / suffix: `phone_digits` starts with the digits, or
+  `phone_reversed` starts with them reversed ("last four digits")
+- name substring: `search_name` contains the term, served by a trigram index
+  on PostgreSQL (when pg_trgm could be enabled) and only tried once the term
+  is MIN_SUBSTRING_LENGTH long
+
+PostgreSQL serves prefixes with LIKE 'term%' on varchar_pattern_ops indexes.
+SQLite's LIKE is case-insensitive and can't use those indexes, so there
+a prefix becomes a range scan: term <= col < term + U+10FFFF.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+
+
+MIN_SUBSTRING_LENGTH = 3
+MIN_PHONE_DIGITS = 3
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+_PHONE_PUNCTUATION = re.compile(r"[+\s()\-]")
+# Sorts after every other code point, so it closes a prefix range.
+_PREFIX_RANGE_END = "\U0010ffff"
+
+
+def normalize_query(query):
+    return " ".join((query or "").lower().split())
+
+
+def phone_query(query):
+    """The digits of `query` if it looks like (part of) a phone number."""
+    digits = _PHONE_PUNCTUATION.sub("", query)
+    if digits.isdigit() and len(digits) >= MIN_PHONE_DIGITS:
+        return digits
+    return None
+
+
+def _prefix(field, value, vendor):
+    if vendor == "postgresql":
+        return Q(**{f"{field}__startswith": value})
+    return Q(**{f"{field}__gte": value, f"{field}__lt": value + _PREFIX_RANGE_END})
+
+
+def match_condition(query, vendor, substring=True):
+    """Q matching members for an already-normalized `query`."""
+    digits = phone_query(query)
+    if digits:
+        return _prefix("phone_digits", digits, vendor) | _prefix("phone_reversed", digits[::-1], vendor)
+
+    condition = _prefix("search_name", query, vendor)
+    if substring and len(query) >= MIN_SUBSTRING_LENGTH:
+        condition |= Q(search_name__contains=query)
+    return condition
+
+
+def _rank(query, vendor):
+    """0 is the best match: exact, then prefix/suffix, then word start, then anywhere."""
+    digits = phone_query(query)
+    if digits:
+        whens = [
+            When(phone_digits=digits, then=Value(0)),
+            When(_prefix("phone_reversed", digits[::-1], vendor), then=Value(1)),
+        ]
+        default = 2
+    else:
+        whens = [
+            When(search_name=query, then=Value(0)),
+            When(_prefix("search_name", query, vendor), then=Value(1)),
+            When(search_name__contains=" " + query, then=Value(2)),
+        ]
+        default = 3
+    return Case(*whens, default=Value(default), output_field=IntegerField())
+
+
+def search_members(queryset, query, limit=DEFAULT_LIMIT):
+    """
+    Best `limit` matches for `query` within `queryset`, ranked.
+
+    Prefix and phone matches come from index range scans. The substring pass
+    only runs when those didn't fill the page, and skips rows already found.
+    """
+    query = normalize_query(query)
+    if not query:
+        return []
+
+    vendor = connections[queryset.db].vendor
+    ranked = queryset.annotate(search_rank=_rank(query, vendor)).order_by("search_rank", "name", "id")
+
+    results = list(ranked.filter(match_condition(query, vendor, substring=False))[:limit])
+    if len(results) < limit and not phone_query(query) and len(query) >= MIN_SUBSTRING_LENGTH:
+        results += ranked.filter(search_name__contains=query).exclude(
+            id__in=[member.id for member in results]
+        )[:limit - len(results)]
+    return results
@@ -1,10 +1,13 @@
 from rest_framework import serializers
-from .models import Member, Payment
+
+from gymmm.metrics import TimedSerializerMixin
+from .models import GymDailyRevenue, Member, MembershipRenewal, Payment, ReceiptSequence
+from .reminders import reminder_message, whatsapp_link
 
 from django.db import transaction
 from django.utils import timezone
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     days_left = serializers.ReadOnlyField()
     remaining_fee = serializers.ReadOnlyField()
 
@@ -68,9 +71,10 @@ class MemberSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        member = super().create(validated_data)
+        # Status is known before the INSERT, so one write per member.
+        member = Member(**validated_data)
         member.update_payment_status()
-        member.save(update_fields=["payment_status"])
+        member.save()
         return member
 
     def update(self, instance, validated_data):
@@ -84,7 +88,44 @@ class MemberSerializer(serializers.ModelSerializer):
 
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class WhatsappReminderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """A reminder message and wa.me link; expects MemberQuerySet.with_balances() rows."""
+
+    remaining_fee = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Member
+        fields = ("id", "name", "phone", "end_date", "payment_status", "remaining_fee")
+
+    def to_representation(self, member):
+        data = super().to_representation(member)
+        data["message"] = reminder_message(member)
+        data["whatsapp_link"] = whatsapp_link(member.phone_digits, data["message"])
+        return data
+
+
+class MembershipRenewalSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    receipt_number = serializers.CharField(source="payment.receipt_number", read_only=True, default=None)
+
+    class Meta:
+        model = MembershipRenewal
+        fields = (
+            "id",
+            "member",
+            "plan",
+            "previous_end_date",
+            "start_date",
+            "end_date",
+            "fee",
+            "carried_over",
+            "payment",
+            "receipt_number",
+            "renewed_at",
+        )
+        read_only_fields = fields
+
+
+class PaymentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source="member.name", read_only=True)
     remaining_after_payment = serializers.SerializerMethodField()
 
@@ -113,7 +154,7 @@ class PaymentSerializer(serializers.ModelSerializer):
         return obj.member.remaining_fee
 
 
-class PaymentCreateSerializer(serializers.ModelSerializer):
+class PaymentCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = ("id", "amount", "payment_date", "note")
@@ -128,6 +169,8 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
         member = self.context["member"]
         amount = attrs["amount"]
 
+        # Early, friendly rejection only; Member.add_payment re-checks against
+        # the live row, since `member` may already be stale.
         if member.amount_paid + amount > member.total_fee:
             raise serializers.ValidationError("Payment exceeds total fee.")
 
@@ -136,20 +179,20 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def create(self, validated_data):
         member = self.context["member"]
+        payment_date = validated_data.get("payment_date") or timezone.localdate()
+
+        if not Member.add_payment(member.pk, validated_data["amount"], payment_date):
+            raise serializers.ValidationError("Payment exceeds total fee.")
 
-        receipt_number = f"RCPT-{member.gym.id.hex[:6].upper()}-{timezone.now().strftime('%Y%m%d%H%M%S')}"
+        receipt_number, = ReceiptSequence.allocate(member.gym_id)
 
         payment = Payment.objects.create(
             member=member,
-            gym=member.gym,
+            gym_id=member.gym_id,
             receipt_number=receipt_number,
             **validated_data
         )
 
-        member.amount_paid += payment.amount
-        member.last_payment_date = payment.payment_date
-        member.update_payment_status()
-        member.save(update_fields=["amount_paid", "last_payment_date", "payment_status", "updated_at"])
+        GymDailyRevenue.record(member.gym_id, payment.payment_date, payment.amount, payments=1)
 
         return payment
-
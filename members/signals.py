@@ -0,0 +1,16 @@
+"""
+Cache invalidation for saves that go through the ORM one object at a time.
+Bulk paths (bulk_create, bulk_update, queryset.update) call
+gym.caching.bump_gym_generation themselves.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from gym.caching import bump_gym_generation
+from .models import Member, Payment
+
+
+@receiver([post_save, post_delete], sender=Member)
+@receiver([post_save, post_delete], sender=Payment)
+def gym_data_changed(sender, instance, **kwargs):
+    bump_gym_generation(instance.gym_id)
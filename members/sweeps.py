@@ -0,0 +1,46 @@
+"""
+Daily member maintenance, driven by the `run_member_sweeps` command.
+
+For each gym:
+
+1. memberships past end_date (plus MEMBER_EXPIRY_GRACE_DAYS) are marked
+   inactive, in small batches walked off the active end_date index, so the
+   is_active=True partial indexes stop carrying stale rows;
+2. a MemberSweepRun records what happened.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from gym.caching import bump_gym_generation
+
+from .models import Member, MemberSweepRun
+
+
+SWEEP_BATCH_SIZE = 1000
+
+
+def expire_members(gym_id, today, batch_size=SWEEP_BATCH_SIZE) -> int:
+    """Mark the gym's lapsed memberships inactive; returns how many."""
+    cutoff = today - timedelta(days=settings.MEMBER_EXPIRY_GRACE_DAYS)
+    lapsed = Member.objects.filter(gym_id=gym_id, is_active=True, end_date__lt=cutoff)
+
+    expired = 0
+    while True:
+        ids = list(lapsed.order_by("end_date", "id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return expired
+        # queryset.update() skips auto_now, so bump updated_at by hand.
+        expired += lapsed.filter(id__in=ids).update(is_active=False, updated_at=timezone.now())
+
+
+def sweep_gym(gym_id, today=None, batch_size=SWEEP_BATCH_SIZE) -> MemberSweepRun:
+    today = today or timezone.localdate()
+    run = MemberSweepRun.objects.create(gym_id=gym_id, run_date=today, started_at=timezone.now())
+
+    run.expired_count = expire_members(gym_id, today, batch_size=batch_size)
+    bump_gym_generation(gym_id)
+    run.finished_at = timezone.now()
+    run.save(update_fields=["expired_count", "finished_at"])
+    return run
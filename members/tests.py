@@ -1,3 +1,947 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from urllib.parse import quote
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from openpyxl import Workbook
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from billing.entitlements import clear_entitlement_cache
+from billing.models import SaaSPlan, OwnerSubscription
+from gym.models import Gym
+from users.models import User
+from .async_views import (
+    AsyncExpiringMembersView,
+    AsyncGymPaymentListView,
+    AsyncPaymentReceiptView,
+    AsyncRevenueSummaryView,
+)
+from .exports import ROWS_PER_WRITE
+from .models import GymDailyRevenue, Member, MembershipRenewal, Payment, ReceiptSequence
+from .renewals import add_months
+from .serializers import PaymentCreateSerializer
+from .sweeps import sweep_gym
+from .views import GymMemberListCreateView
+
+
+# The async read views under /async/, next to the normal (sync) routes.
+urlpatterns = [
+    path("async/gyms/<uuid:gym_id>/dashboard/revenue-summary/", AsyncRevenueSummaryView.as_view(),
+         name="async-revenue-summary"),
+    path("async/gyms/<uuid:gym_id>/members/expiring/", AsyncExpiringMembersView.as_view(),
+         name="async-expiring-members"),
+    path("async/gyms/<uuid:gym_id>/payments/", AsyncGymPaymentListView.as_view(), name="async-gym-payments"),
+    path("async/gyms/<uuid:gym_id>/payments/<int:payment_id>/receipt/", AsyncPaymentReceiptView.as_view(),
+         name="async-payment-receipt"),
+    path("", include("gymmm.urls")),
+]
+
+
+class GymAPITestCase(TestCase):
+    """An owner with an active subscription, one gym and an authenticated client."""
+
+    def setUp(self):
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        OwnerSubscription.objects.create(owner=self.user, plan=plan, status=OwnerSubscription.Status.ACTIVE)
+        self.gym = Gym.objects.create(owner=self.user, name="Iron Temple")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_members(self, count, prefix="Member", **fields):
+        fields.setdefault("end_date", timezone.localdate() + timedelta(days=30))
+        fields.setdefault("total_fee", Decimal("1000.00"))
+        return Member.objects.bulk_create(
+            Member(gym=self.gym, **{"name": f"{prefix} {i}", **fields})
+            for i in range(count)
+        )
+
+    def url(self, name, **kwargs):
+        return reverse(name, kwargs={"gym_id": self.gym.id, **kwargs})
+
+
+class GymPaymentLedgerTests(GymAPITestCase):
+    def make_payments(self, count):
+        today = timezone.localdate()
+        members = Member.objects.bulk_create(
+            Member(
+                gym=self.gym,
+                name=f"Member {i}",
+                end_date=today + timedelta(days=30),
+                total_fee=Decimal("1000.00"),
+                amount_paid=Decimal("100.00"),
+            )
+            for i in range(count)
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                member=member,
+                gym=self.gym,
+                amount=Decimal("100.00"),
+                payment_date=today - timedelta(days=i % 7),
+                receipt_number=f"RCPT-TEST-{i:06d}",
+            )
+            for i, member in enumerate(members)
+        )
+
+    def count_queries(self, page_size):
+        url = reverse("gym-payments", kwargs={"gym_id": self.gym.id})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"page_size": page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), page_size)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.make_payments(60)
+        self.count_queries(1)  # warm the entitlement cache
+
+        self.assertEqual(self.count_queries(5), self.count_queries(50))
+
+    def test_rows_include_member_fields(self):
+        self.make_payments(3)
+        url = reverse("gym-payments", kwargs={"gym_id": self.gym.id})
+
+        row = self.client.get(url).data["results"][0]
+
+        self.assertEqual(row["student_name"], "Member 0")
+        self.assertEqual(row["remaining_after_payment"], Decimal("900.00"))
+
+    def test_filters_by_date_range(self):
+        self.make_payments(14)
+        url = reverse("gym-payments", kwargs={"gym_id": self.gym.id})
+        today = timezone.localdate()
+
+        response = self.client.get(url, {"start": today.isoformat(), "end": today.isoformat()})
+
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(self.client.get(url, {"start": "not-a-date"}).status_code, 400)
+
+
+class MemberKeysetPaginationTests(GymAPITestCase):
+    def walk(self, url, params, direction="next"):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            link = response.data[direction]
+            if not link:
+                return ids, response
+            response = self.client.get(link)
+
+    def test_pages_through_ties_without_gaps_or_repeats(self):
+        today = timezone.localdate()
+        # Most members share an end_date, so pages have to split inside a tie.
+        members = (
+            self.make_members(7, prefix="Tie", end_date=today + timedelta(days=10))
+            + self.make_members(3, prefix="Early", end_date=today + timedelta(days=5))
+            + self.make_members(2, prefix="Late", end_date=today + timedelta(days=20))
+        )
+        expected = [m.id for m in sorted(members, key=lambda m: (m.end_date, m.id))]
+
+        ids, last_page = self.walk(self.url("gym-members-list-create"), {"page_size": 3})
+        self.assertEqual(ids, expected)
+
+        # And back again from the last page.
+        back = [row["id"] for row in last_page.data["results"]]
+        response = last_page
+        while response.data["previous"]:
+            response = self.client.get(response.data["previous"])
+            back = [row["id"] for row in response.data["results"]] + back
+        self.assertEqual(back, expected)
+
+    def test_descending_ordering_with_ties(self):
+        members = self.make_members(5, name="Sam") + self.make_members(2, name="Ann")
+        expected = [m.id for m in sorted(members, key=lambda m: (m.name, m.id), reverse=True)]
+
+        ids, _ = self.walk(self.url("gym-members-list-create"), {"page_size": 2, "ordering": "-name"})
+        self.assertEqual(ids, expected)
+
+    def test_rejects_tampered_cursor(self):
+        response = self.client.get(self.url("gym-members-list-create"), {"cursor": "bm9wZQ=="})
+        self.assertEqual(response.status_code, 404)
+
+
+class GymScopedResolutionTests(GymAPITestCase):
+    def test_member_and_gym_resolved_in_one_query(self):
+        member = self.make_members(1)[0]
+        url = self.url("gym-member-detail", member_id=member.id)
+        self.client.get(url)  # warm the entitlement cache
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data["id"], member.id)
+
+    def test_missing_member_and_foreign_gym_are_told_apart(self):
+        response = self.client.get(self.url("gym-member-detail", member_id=999999))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["detail"], "Member not found.")
+
+        other_owner = User.objects.create_user(username="other@example.com", password="secret123")
+        other_gym = Gym.objects.create(owner=other_owner, name="Elsewhere")
+        member = Member.objects.create(gym=other_gym, name="Theirs", end_date=timezone.localdate())
+        response = self.client.get(reverse("gym-member-detail", kwargs={"gym_id": other_gym.id, "member_id": member.id}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["detail"], "Gym not found.")
+
+
+class RevenueRollupTests(GymAPITestCase):
+    def series(self):
+        response = self.client.get(self.url("revenue-series"))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_member_edits_are_not_revenue(self):
+        response = self.client.post(self.url("gym-members-list-create"), {
+            "name": "Asha",
+            "start_date": timezone.localdate(),
+            "end_date": timezone.localdate() + timedelta(days=30),
+            "total_fee": "1000.00",
+            "amount_paid": "400.00",
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+
+        url = self.url("gym-member-detail", member_id=response.data["id"])
+        response = self.client.patch(url, {"amount_paid": "100.00"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(self.series()["total_collected"], Decimal("0.00"))
+
+    def test_payments_are_rolled_up_on_their_date(self):
+        member = self.make_members(1)[0]
+        day = timezone.localdate() - timedelta(days=3)
+
+        for amount in ("300.00", "200.00"):
+            response = self.client.post(
+                self.url("member-payments", member_id=member.id),
+                {"amount": amount, "payment_date": day},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+
+        series = self.series()
+        self.assertEqual(series["total_collected"], Decimal("500.00"))
+        self.assertEqual(
+            [(row["period"], row["collected"], row["payments_count"]) for row in series["results"]],
+            [(day, Decimal("500.00"), 2)],
+        )
+
+    def test_record_payments_rolls_up_a_batch_by_date(self):
+        today = timezone.localdate()
+        yesterday = today - timedelta(days=1)
+        payments = [
+            Payment(amount=Decimal(amount), payment_date=day)
+            for amount, day in (("300.00", yesterday), ("200.00", today), ("50.00", yesterday))
+        ]
+
+        GymDailyRevenue.record_payments(self.gym.id, payments)
+
+        self.assertEqual(
+            list(GymDailyRevenue.objects.filter(gym=self.gym).values_list("date", "collected", "payments_count")),
+            [(yesterday, Decimal("350.00"), 2), (today, Decimal("200.00"), 1)],
+        )
+
+
+class ReceiptSequenceTests(TestCase):
+    def test_numbers_are_consecutive_per_prefix(self):
+        gym_id = uuid.UUID("abcdef00-0000-4000-8000-000000000001")
+
+        self.assertEqual(ReceiptSequence.allocate(gym_id), ["RCPT-ABCDEF-000001"])
+        self.assertEqual(
+            ReceiptSequence.allocate(gym_id, count=3),
+            ["RCPT-ABCDEF-000002", "RCPT-ABCDEF-000003", "RCPT-ABCDEF-000004"],
+        )
+
+    def test_gyms_sharing_a_prefix_share_the_counter(self):
+        first = uuid.UUID("abcdef00-0000-4000-8000-000000000001")
+        second = uuid.UUID("abcdef99-0000-4000-8000-000000000002")
+
+        self.assertEqual(ReceiptSequence.allocate(first), ["RCPT-ABCDEF-000001"])
+        self.assertEqual(ReceiptSequence.allocate(second), ["RCPT-ABCDEF-000002"])
+
+    def test_rolled_back_numbers_are_handed_out_again(self):
+        gym_id = uuid.UUID("abcdef00-0000-4000-8000-000000000001")
+        ReceiptSequence.allocate(gym_id)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            ReceiptSequence.allocate(gym_id)
+            raise RuntimeError
+
+        self.assertEqual(ReceiptSequence.allocate(gym_id), ["RCPT-ABCDEF-000002"])
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class ConcurrentReceiptSequenceTests(TransactionTestCase):
+    def test_concurrent_allocations_never_collide(self):
+        gym_id = uuid.UUID("abcdef00-0000-4000-8000-000000000001")
+        allocated = []
+        barrier = threading.Barrier(8)
+
+        def allocate():
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    allocated.extend(ReceiptSequence.allocate(gym_id, count=2))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(allocated), [f"RCPT-ABCDEF-{n:06d}" for n in range(1, 17)])
+
+
+class MemberPaymentTests(GymAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = self.make_members(1)[0]
+
+    def pay(self, amount, **fields):
+        return self.client.post(
+            self.url("member-payments", member_id=self.member.id), {"amount": amount, **fields}, format="json",
+        )
+
+    def test_payments_update_balance_status_and_latest_date(self):
+        self.assertEqual(self.pay("600.00", payment_date="2026-10-10").status_code, 201)
+        self.assertEqual(self.pay("400.00", payment_date="2026-10-01").status_code, 201)
+
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.amount_paid, Decimal("1000.00"))
+        self.assertEqual(self.member.payment_status, Member.PaymentStatus.PAID)
+        self.assertEqual(str(self.member.last_payment_date), "2026-10-10")
+
+    def test_overpayment_is_rejected(self):
+        self.pay("900.00")
+
+        response = self.pay("200.00")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.amount_paid, Decimal("900.00"))
+
+    def test_add_payment_rechecks_the_live_row(self):
+        self.assertTrue(Member.add_payment(self.member.pk, Decimal("1000.00"), timezone.localdate()))
+
+        self.assertFalse(Member.add_payment(self.member.pk, Decimal("0.01"), timezone.localdate()))
+        self.member.refresh_from_db()
+        self.assertEqual(self.member.amount_paid, Decimal("1000.00"))
+
+    def test_stale_member_cannot_overpay(self):
+        serializer = PaymentCreateSerializer(data={"amount": "200.00"}, context={"member": self.member})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # Another payment lands after validation saw the old balance.
+        Member.add_payment(self.member.pk, Decimal("900.00"), timezone.localdate())
+
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertFalse(Payment.objects.exists())
+
+
+class BulkPaymentTests(GymAPITestCase):
+    def post(self, data, **kwargs):
+        return self.client.post(self.url("payments-bulk-create"), data, **kwargs)
+
+    def test_valid_rows_are_written_and_invalid_ones_reported(self):
+        first, second = self.make_members(2)
+        rows = [
+            {"member_id": first.id, "amount": "300.00", "payment_date": "2026-10-01"},
+            {"member_id": 999999, "amount": "5.00"},
+            {"member_id": second.id, "amount": "-1"},
+            {"member_id": first.id, "amount": "800.00"},
+            {"member_id": second.id, "amount": "1000.00"},
+        ]
+
+        response = self.post(rows, format="json")
+
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            [(error["row"], list(error["errors"])) for error in response.data["errors"]],
+            [(1, ["member_id"]), (2, ["amount"]), (3, ["amount"])],
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.amount_paid, first.payment_status), (Decimal("300.00"), Member.PaymentStatus.PARTIAL))
+        self.assertEqual((second.amount_paid, second.payment_status), (Decimal("1000.00"), Member.PaymentStatus.PAID))
+        receipts = [payment["receipt_number"] for payment in response.data["payments"]]
+        self.assertEqual(len(set(receipts)), 2)
+
+    def test_csv_upload(self):
+        member = self.make_members(1)[0]
+        body = f"member_id,amount,payment_date,note\n{member.id},100,,cash\n{member.id},abc,,\n".encode()
+
+        response = self.post({"file": SimpleUploadedFile("payments.csv", body, content_type="text/csv")}, format="multipart")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 1)
+        self.assertEqual(Payment.objects.get().note, "cash")
+
+    def test_csv_that_is_not_utf8_is_a_400(self):
+        member = self.make_members(1)[0]
+        body = f"member_id,amount,note\n{member.id},100,Café\n".encode("cp1252")
+
+        response = self.post({"file": SimpleUploadedFile("payments.csv", body, content_type="text/csv")}, format="multipart")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("UTF-8", response.data[0])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_rejects_a_body_that_is_not_a_list(self):
+        response = self.post({"member_id": 1, "amount": "5.00"}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MemberImportTests(GymAPITestCase):
+    HEADER = "name,phone,start_date,end_date,total_fee,amount_paid\n"
+
+    def upload(self, body):
+        return self.client.post(
+            self.url("gym-members-import"),
+            {"file": SimpleUploadedFile("members.csv", body.encode(), content_type="text/csv")},
+            format="multipart",
+        )
+
+    def test_valid_rows_are_created_and_invalid_ones_reported(self):
+        rows = "".join(f"Member {i},99999,2026-01-01,2030-01-01,1000,{(i % 3) * 500}\n" for i in range(5))
+        rows += "Broken,,2026-01-01,2025-01-01,100,0\n"
+        rows += "Overpaid,,2026-01-01,2030-01-01,100,200\n"
+
+        response = self.upload(self.HEADER + rows)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["created"], response.data["error_count"]), (5, 2))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [5, 6])
+        self.assertEqual(
+            sorted(Member.objects.filter(gym=self.gym).values_list("payment_status", flat=True)),
+            ["paid", "partial", "partial", "pending", "pending"],
+        )
+
+    def test_all_rows_invalid_is_a_bad_request(self):
+        response = self.upload(self.HEADER + "Broken,,2026-01-01,2025-01-01,100,0\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Member.objects.exists())
+
+    def test_json_array(self):
+        response = self.client.post(self.url("gym-members-import"), [
+            {"name": "Asha", "start_date": "2026-01-01", "end_date": "2030-01-01", "total_fee": "500", "amount_paid": "500"},
+        ], format="json")
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(Member.objects.get().payment_status, Member.PaymentStatus.PAID)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write(self.HEADER + "Asha,,2026-01-01,2030-01-01,500,0\nBroken,,2026-01-01,2025-01-01,1,0\nRavi,,2026-01-01,2030-01-01,500,0\n")
+            f.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command("import_members", str(self.gym.id), f.name, "--batch-size", "1", stdout=stdout, stderr=stderr)
+
+        self.assertIn("Imported 2 member(s)", stdout.getvalue())
+        self.assertIn("row 1:", stderr.getvalue())
+        self.assertEqual(sorted(Member.objects.filter(gym=self.gym).values_list("name", flat=True)), ["Asha", "Ravi"])
+
+    def test_xlsx_upload(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["name", "phone", "start_date", "end_date", "total_fee", "amount_paid"])
+        sheet.append(["Asha", 9876543210, datetime(2026, 1, 1), date(2030, 1, 1), 1000, 400])
+        sheet.append(["Broken", None, date(2026, 1, 1), date(2025, 1, 1), 100, 0])
+        body = BytesIO()
+        workbook.save(body)
+
+        response = self.client.post(
+            self.url("gym-members-import"),
+            {"file": SimpleUploadedFile("members.xlsx", body.getvalue())},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.data["created"], response.data["error_count"]), (1, 1))
+        member = Member.objects.get()
+        self.assertEqual((member.name, member.phone, str(member.start_date)), ("Asha", "9876543210", "2026-01-01"))
+        self.assertEqual(member.payment_status, Member.PaymentStatus.PARTIAL)
+
+    def test_unreadable_files_are_a_bad_request(self):
+        for name, body in [("members.csv", "name\nJosé\n".encode("cp1252")), ("members.xlsx", b"not a workbook")]:
+            with self.subTest(name=name):
+                response = self.client.post(
+                    self.url("gym-members-import"), {"file": SimpleUploadedFile(name, body)}, format="multipart",
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_management_command_reports_unreadable_files(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".csv") as f:
+            f.write((self.HEADER + "José,,2026-01-01,2030-01-01,500,0\n").encode("cp1252"))
+            f.flush()
+            with self.assertRaisesMessage(CommandError, "UTF-8"):
+                call_command("import_members", str(self.gym.id), f.name, stdout=StringIO())
+
+
+class ExportTests(GymAPITestCase):
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_member_csv_streams_every_active_member_in_chunks(self):
+        members = self.make_members(ROWS_PER_WRITE + 5)
+        Member.objects.filter(pk=members[0].pk).update(is_active=False)
+
+        response = self.client.get(self.url("gym-members-export-csv"), HTTP_ACCEPT="text/csv")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn(f'filename="members-{self.gym.id}.csv"', response["Content-Disposition"])
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.DictReader(StringIO("".join(chunks))))
+        self.assertEqual(len(rows), ROWS_PER_WRITE + 4)
+        self.assertEqual(rows[0]["total_fee"], "1000.00")
+
+        response = self.client.get(self.url("gym-members-export-csv"), {"include_inactive": "1"})
+        self.assertEqual(self.read(response).count("\r\n"), ROWS_PER_WRITE + 6)
+
+    def test_payment_ndjson_with_date_range(self):
+        first, second = self.make_members(2, prefix="Student")
+        self.client.post(self.url("payments-bulk-create"), [
+            {"member_id": first.id, "amount": "100.00", "payment_date": "2026-01-05"},
+            {"member_id": second.id, "amount": "200.00", "payment_date": "2026-02-05"},
+        ], format="json")
+
+        response = self.client.get(self.url("payments-export-ndjson"), {"start": "2026-02-01"})
+
+        records = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["student_name"], "Student 1")
+        self.assertEqual((records[0]["amount"], records[0]["payment_date"]), ("200.00", "2026-02-05"))
+
+    def test_bad_date_is_a_json_error(self):
+        response = self.client.get(self.url("payments-export-csv"), {"start": "bad"}, HTTP_ACCEPT="text/csv")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("start", response.json())
+
+
+class MemberBalanceAnnotationTests(GymAPITestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        cases = [
+            (-40, "0.00"), (-1, "250.50"), (0, "1000.00"), (1, "999.99"), (3, "1200.00"), (400, "0.00"),
+        ]
+        self.members = Member.objects.bulk_create(
+            Member(
+                gym=self.gym,
+                name=f"Member {i}",
+                end_date=today + timedelta(days=offset),
+                total_fee=Decimal("1000.00"),
+                amount_paid=Decimal(paid),
+            )
+            for i, (offset, paid) in enumerate(cases)
+        )
+
+    def test_annotations_match_the_model_properties(self):
+        annotated = Member.objects.with_balances().in_bulk([m.pk for m in self.members])
+
+        for member in Member.objects.filter(gym=self.gym):
+            with self.subTest(member=member.name):
+                self.assertEqual(annotated[member.pk].days_left, member.days_left)
+                self.assertEqual(annotated[member.pk].remaining_fee, member.remaining_fee)
+
+    def test_filter_and_order_on_annotations(self):
+        url = self.url("gym-members-list-create")
+
+        response = self.client.get(url, {"remaining_fee__gt": "0", "ordering": "days_left", "page_size": 100})
+        days = [row["days_left"] for row in response.data["results"]]
+        self.assertEqual(days, [-40, -1, 1, 400])
+
+        response = self.client.get(url, {"days_left__lte": "1", "days_left__gte": "0", "page_size": 100})
+        self.assertEqual(sorted(row["days_left"] for row in response.data["results"]), [0, 1])
+
+        self.assertEqual(self.client.get(url, {"days_left": "abc"}).status_code, 400)
+
+    def test_rejects_values_the_database_cannot_compare(self):
+        url = self.url("gym-members-list-create")
+
+        for key, value in [
+            ("remaining_fee__gt", "NaN"),
+            ("remaining_fee__lt", "Infinity"),
+            ("remaining_fee", "sNaN"),
+            ("remaining_fee__gte", "abc"),
+            ("days_left__lte", "99999999999"),
+        ]:
+            with self.subTest(**{key: value}):
+                response = self.client.get(url, {key: value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(key, response.data)
+
+
+class MemberSearchTests(GymAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for name, phone, fields in [
+            ("Rahul Sharma", "+91 98765-43210", {}),
+            ("Rahul", "9000012345", {"course_taken": "Yoga"}),
+            ("Anita Rahulkar", "9111100000", {}),
+            ("Priya Rahul", "9222243210", {"offer_taken": "Diwali"}),
+            ("Sam", "9333300000", {}),
+            ("Rahul Gone", "9444400000", {"is_active": False}),
+        ]:
+            self.make_members(1, name=name, phone=phone, **fields)
+
+    def typeahead(self, **params):
+        response = self.client.get(self.url("gym-members-search"), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["name"] for row in response.data]
+
+    def list_search(self, term):
+        response = self.client.get(self.url("gym-members-list-create"), {"search": term, "ordering": "name"})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["name"] for row in response.data["results"]]
+
+    def test_generated_search_columns(self):
+        member = Member.objects.get(name="Rahul Sharma")
+
+        self.assertEqual(
+            (member.search_name, member.phone_digits, member.phone_reversed),
+            ("rahul sharma", "919876543210", "012345678919"),
+        )
+
+    def test_typeahead_ranks_exact_then_prefix_then_word_then_substring(self):
+        self.assertEqual(self.typeahead(q="RAHUL"), ["Rahul", "Rahul Sharma", "Anita Rahulkar", "Priya Rahul"])
+        self.assertEqual(self.typeahead(q="hul"), ["Anita Rahulkar", "Priya Rahul", "Rahul", "Rahul Sharma"])
+        self.assertEqual(self.typeahead(q="rahul", limit=2), ["Rahul", "Rahul Sharma"])
+        self.assertEqual(self.typeahead(q="ra"), ["Rahul", "Rahul Sharma"])
+        self.assertEqual(self.typeahead(q=""), [])
+
+    def test_typeahead_matches_phone_prefix_and_last_digits(self):
+        self.assertEqual(self.typeahead(q="9000"), ["Rahul"])
+        self.assertEqual(self.typeahead(q="43210"), ["Priya Rahul", "Rahul Sharma"])
+        self.assertEqual(self.typeahead(q="98765 43210"), ["Rahul Sharma"])
+
+    def test_typeahead_rejects_bad_limit(self):
+        for limit in ("x", "0"):
+            response = self.client.get(self.url("gym-members-search"), {"q": "a", "limit": limit})
+            self.assertEqual(response.status_code, 400)
+
+    def test_list_search_keeps_search_filter_semantics(self):
+        self.assertEqual(self.list_search("hulk"), ["Anita Rahulkar"])
+        self.assertEqual(self.list_search("yoga"), ["Rahul"])
+        self.assertEqual(self.list_search("diwali"), ["Priya Rahul"])
+        self.assertEqual(self.list_search("rahul sharma"), ["Rahul Sharma"])
+        self.assertEqual(self.list_search("a"), ["Anita Rahulkar", "Priya Rahul", "Rahul", "Rahul Sharma", "Sam"])
+
+    def test_every_list_search_field_has_a_trigram_index(self):
+        # SearchFilter ORs the fields; one without an index means a scan.
+        migration = import_module("members.migrations.0010_member_list_search_indexes")
+
+        self.assertEqual(migration.SEARCH_FIELDS, GymMemberListCreateView.search_fields)
+
+
+class WhatsappReminderTests(GymAPITestCase):
+    def test_single_member_reminder(self):
+        member = self.make_members(
+            1, name="Asha", phone="9876543210", amount_paid=Decimal("400.00"), payment_status="partial",
+        )[0]
+
+        response = self.client.get(self.url("member-whatsapp-reminder", member_id=member.id))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["message"], (
+            "Hello Asha, your fee payment is pending.\n"
+            "Total Fee: ₹1000.00\n"
+            "Paid: ₹400.00\n"
+            "Remaining: ₹600.00\n"
+            "Please clear the balance. Thank you."
+        ))
+        self.assertEqual(
+            response.data["whatsapp_link"],
+            f"https://wa.me/919876543210?text={quote(response.data['message'])}",
+        )
+        self.assertEqual(response.data["remaining_fee"], Decimal("600.00"))
+        self.assertEqual(response.data["payment_status"], "partial")
+
+    def test_single_member_without_phone(self):
+        member = self.make_members(1)[0]
+
+        response = self.client.get(self.url("member-whatsapp-reminder", member_id=member.id))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_filters_by_status_and_window(self):
+        today = timezone.localdate()
+        Member.objects.bulk_create([
+            Member(gym=self.gym, name="Owes", phone="+91 98765-43210", end_date=today + timedelta(days=3),
+                   total_fee=Decimal("1000.00"), amount_paid=Decimal("0.00"), payment_status="pending"),
+            Member(gym=self.gym, name="Later", phone="9000000001", end_date=today + timedelta(days=30),
+                   total_fee=Decimal("1000.00"), amount_paid=Decimal("500.00"), payment_status="partial"),
+            Member(gym=self.gym, name="Paid", phone="9000000002", end_date=today + timedelta(days=2),
+                   total_fee=Decimal("1000.00"), amount_paid=Decimal("1000.00"), payment_status="paid"),
+        ])
+        url = self.url("whatsapp-reminders")
+
+        rows = self.client.get(url).data["results"]
+        self.assertEqual([row["name"] for row in rows], ["Owes", "Later"])
+        self.assertTrue(rows[0]["whatsapp_link"].startswith("https://wa.me/919876543210?text="))
+        self.assertIn("Remaining: ₹1000.00", rows[0]["message"])
+
+        rows = self.client.get(url, {"status": "paid", "expiring_within": 7}).data["results"]
+        self.assertEqual([row["name"] for row in rows], ["Paid"])
+        self.assertIn("please renew", rows[0]["message"].lower())
+
+        self.assertEqual(self.client.get(url, {"status": "owing"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"expiring_within": "soon"}).status_code, 400)
+
+
+class ExpiringMembersTests(GymAPITestCase):
+    def names(self, **params):
+        response = self.client.get(self.url("expiring-members"), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["name"] for row in response.data["results"]]
+
+    def test_window_and_changes_after_the_daily_sweep(self):
+        today = timezone.localdate()
+        self.make_members(1, name="Soon", end_date=today + timedelta(days=2))
+        renewed = self.make_members(1, name="Renewed", end_date=today + timedelta(days=3))[0]
+        self.make_members(1, name="Later", end_date=today + timedelta(days=20))
+        sweep_gym(self.gym.id)
+
+        self.make_members(1, name="Joined", end_date=today + timedelta(days=1))
+        Member.objects.filter(pk=renewed.pk).update(end_date=today + timedelta(days=60))
+        Member.objects.filter(name="Later").update(end_date=today + timedelta(days=5))
+
+        self.assertEqual(self.names(), ["Joined", "Soon", "Later"])
+        self.assertEqual(self.names(days=30), ["Joined", "Soon", "Later"])
+        self.assertEqual(self.names(days=1), ["Joined"])
+
+    def test_rejects_bad_days(self):
+        response = self.client.get(self.url("expiring-members"), {"days": "week"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class MemberSweepTests(GymAPITestCase):
+    def test_sweep_expires_lapsed_memberships_and_records_the_run(self):
+        today = timezone.localdate()
+        self.make_members(3, prefix="Lapsed", end_date=today - timedelta(days=1))
+        self.make_members(2, prefix="Current", end_date=today)
+
+        run = sweep_gym(self.gym.id, today=today, batch_size=2)
+
+        self.assertEqual(run.expired_count, 3)
+        self.assertIsNotNone(run.duration_ms)
+        self.assertEqual(
+            sorted(Member.objects.filter(is_active=True).values_list("name", flat=True)),
+            ["Current 0", "Current 1"],
+        )
+
+    def test_admin_list_query_count_does_not_grow_with_runs(self):
+        self.client.force_login(User.objects.create_superuser(username="admin@example.com", password="secret123"))
+        url = reverse("admin:members_membersweeprun_changelist")
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            return len(queries)
+
+        for _ in range(2):
+            sweep_gym(Gym.objects.create(owner=self.user, name="Branch").id)
+        few = count_queries()
+        for _ in range(4):
+            sweep_gym(Gym.objects.create(owner=self.user, name="Branch").id)
+
+        self.assertEqual(count_queries(), few)
+
+
+class MembershipRenewalTests(GymAPITestCase):
+    def renew(self, member, **data):
+        return self.client.post(self.url("gym-member-renew", member_id=member.id), data, format="json")
+
+    def test_add_months_clamps_to_month_end(self):
+        self.assertEqual(add_months(date(2026, 1, 31), 1), date(2026, 2, 28))
+        self.assertEqual(add_months(date(2026, 12, 31), 1), date(2027, 1, 31))
+        self.assertEqual(add_months(date(2026, 11, 15), 12), date(2027, 11, 15))
+
+    def test_renewal_carries_balance_and_records_payment(self):
+        today = timezone.localdate()
+        end = today + timedelta(days=5)
+        member = self.make_members(1, end_date=end, amount_paid=Decimal("600.00"), payment_status="partial")[0]
+
+        response = self.renew(member, fee="1200.00", amount="500.00")
+
+        self.assertEqual(response.status_code, 201, response.content)
+        data = response.json()
+        self.assertEqual(data["member"]["start_date"], end.isoformat())
+        self.assertEqual(data["member"]["end_date"], add_months(end, 1).isoformat())
+        self.assertEqual(data["member"]["total_fee"], "1600.00")
+        self.assertEqual(data["member"]["amount_paid"], "500.00")
+        self.assertEqual(data["member"]["payment_status"], "partial")
+        self.assertEqual(data["renewal"]["carried_over"], "400.00")
+        self.assertTrue(data["renewal"]["receipt_number"].startswith("RCPT-"))
+        self.assertEqual(Payment.objects.get(member=member).amount, Decimal("500.00"))
+        self.assertEqual(GymDailyRevenue.objects.get(gym=self.gym, date=today).payments_count, 1)
+
+    def test_fee_defaults_to_the_last_renewal(self):
+        member = self.make_members(1, amount_paid=Decimal("1000.00"), payment_status="paid")[0]
+        self.renew(member, fee="1200.00")
+
+        response = self.renew(member, plan="yearly")
+
+        self.assertEqual(response.json()["renewal"]["fee"], "1200.00")
+        self.assertIsNone(response.json()["renewal"]["receipt_number"])
+        self.assertEqual(MembershipRenewal.objects.filter(member=member).count(), 2)
+
+    def test_overpayment_is_rejected(self):
+        member = self.make_members(1)[0]
+
+        response = self.renew(member, amount="99999.00")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(MembershipRenewal.objects.exists())
+
+    def test_lapsed_member_is_reactivated_from_today(self):
+        today = timezone.localdate()
+        member = self.make_members(
+            1, end_date=today - timedelta(days=40), is_active=False,
+            amount_paid=Decimal("1000.00"), payment_status="paid",
+        )[0]
+
+        response = self.renew(member)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        member.refresh_from_db()
+        self.assertTrue(member.is_active)
+        self.assertEqual(member.start_date, today)
+        self.assertEqual(member.payment_status, Member.PaymentStatus.PENDING)
+
+    def test_bulk_renewal_runs_a_fixed_number_of_queries(self):
+        url = self.url("gym-members-renew")
+        ids = [member.id for member in self.make_members(16)]
+        self.client.post(url, {"member_ids": ids[:1], "amount": "100.00"}, format="json")
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(url, {"member_ids": ids[1:4], "amount": "100.00"}, format="json")
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.post(url, {"member_ids": ids[4:] + [999999], "amount": "100.00"}, format="json")
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(response.data["renewed"], 12)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [12])
+        self.assertEqual(MembershipRenewal.objects.filter(payment__isnull=False).count(), 16)
+
+        response = self.client.post(url, [{"member_id": ids[0], "plan": "weekly"}], format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncReadViewTests(GymAPITestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        self.members = (
+            self.make_members(5, prefix="Soon", end_date=today + timedelta(days=3))
+            + self.make_members(3, prefix="Later", end_date=today + timedelta(days=20))
+        )
+        for member in self.members[:4]:
+            response = self.client.post(
+                self.url("member-payments", member_id=member.id), {"amount": "250.00"}, format="json",
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+        self.payment = Payment.objects.filter(gym=self.gym).first()
+
+    def both(self, name, params=None, **kwargs):
+        sync = self.client.get(self.url(name, **kwargs), params)
+        async_ = self.client.get(self.url(f"async-{name}", **kwargs), params)
+        self.assertEqual(sync.status_code, 200, sync.content)
+        self.assertEqual(async_.status_code, 200, async_.content)
+        return sync, async_
+
+    def test_payloads_match_the_sync_views(self):
+        reads = [
+            ("revenue-summary", None, {}),
+            ("expiring-members", {"days": 10}, {}),
+            ("gym-payments", None, {}),
+            ("gym-payments", {"member": self.members[0].id}, {}),
+            ("payment-receipt", None, {"payment_id": self.payment.id}),
+        ]
+        for name, params, kwargs in reads:
+            with self.subTest(name=name, params=params):
+                sync, async_ = self.both(name, params, **kwargs)
+                self.assertEqual(async_.json(), sync.json())
+
+    def test_cursor_pages_match_the_sync_views(self):
+        sync, async_ = self.both("expiring-members", {"days": 30, "page_size": 3})
+        pages = 1
+        while sync.data["next"]:
+            self.assertEqual(async_.data["results"], sync.data["results"])
+            self.assertIn("/async/", async_.data["next"])
+            sync, async_ = self.client.get(sync.data["next"]), self.client.get(async_.data["next"])
+            pages += 1
+
+        self.assertEqual(async_.data["results"], sync.data["results"])
+        self.assertIsNone(async_.data["next"])
+        self.assertEqual(pages, 3)
+
+    def test_missing_receipt_is_404(self):
+        response = self.client.get(self.url("async-payment-receipt", payment_id=self.payment.id + 1000))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data["detail"], "Payment not found.")
+
+    def test_other_owners_gym_is_404(self):
+        other = Gym.objects.create(owner=User.objects.create_user(username="other@example.com"), name="Elsewhere")
+
+        response = self.client.get(reverse("async-revenue-summary", kwargs={"gym_id": other.id}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_bad_days_is_400(self):
+        self.assertEqual(self.client.get(self.url("async-expiring-members"), {"days": "soon"}).status_code, 400)
+
+    def test_unauthenticated_request_is_401(self):
+        self.client.force_authenticate(None)
+
+        for name in ("async-revenue-summary", "async-expiring-members", "async-gym-payments"):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(self.url(name)).status_code, 401)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_response_cache"},
+        },
+        RESPONSE_CACHE_ALIAS="shared",
+    )
+    def test_etag_and_304(self):
+        call_command("createcachetable", "test_response_cache")
+        for name, kwargs in (("async-revenue-summary", {}), ("async-payment-receipt", {"payment_id": self.payment.id})):
+            with self.subTest(name=name):
+                url = self.url(name, **kwargs)
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], first["ETag"])
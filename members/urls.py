@@ -1,23 +1,59 @@
+from django.conf import settings
 from django.urls import path
+
+from .async_views import (
+    AsyncExpiringMembersView,
+    AsyncGymPaymentListView,
+    AsyncPaymentReceiptView,
+    AsyncRevenueSummaryView,
+)
 from .views import (
     GymMemberListCreateView,
+    MemberImportView,
+    MemberSearchView,
     ExpiringMembersView,
     GymMemberDetailView,
     GymMemberDeleteView,
+    MemberRenewView,
+    BulkMemberRenewView,
     MemberPaymentListCreateView,
+    GymPaymentListView,
+    BulkPaymentCreateView,
     RevenueSummaryView,
+    RevenueSeriesView,
     MemberWhatsappReminderView,
+    WhatsappReminderListView,
     PaymentReceiptView,
+    MemberExportView,
+    PaymentExportView,
 )
 
+if settings.ASYNC_READ_VIEWS:
+    ExpiringMembersView = AsyncExpiringMembersView
+    GymPaymentListView = AsyncGymPaymentListView
+    RevenueSummaryView = AsyncRevenueSummaryView
+    PaymentReceiptView = AsyncPaymentReceiptView
+
 urlpatterns = [
     path("gyms/<uuid:gym_id>/members/", GymMemberListCreateView.as_view(), name="gym-members-list-create"),
+    path("gyms/<uuid:gym_id>/members/search/", MemberSearchView.as_view(), name="gym-members-search"),
+    path("gyms/<uuid:gym_id>/members/import/", MemberImportView.as_view(), name="gym-members-import"),
+    path("gyms/<uuid:gym_id>/members/export.csv", MemberExportView.as_view(), {"fmt": "csv"}, name="gym-members-export-csv"),
+    path("gyms/<uuid:gym_id>/members/export.ndjson", MemberExportView.as_view(), {"fmt": "ndjson"}, name="gym-members-export-ndjson"),
+    path("gyms/<uuid:gym_id>/members/renew/", BulkMemberRenewView.as_view(), name="gym-members-renew"),
     path("gyms/<uuid:gym_id>/members/expiring/", ExpiringMembersView.as_view(), name="expiring-members"),
     path("gyms/<uuid:gym_id>/members/<int:member_id>/", GymMemberDetailView.as_view(), name="gym-member-detail"),
     path("gyms/<uuid:gym_id>/members/<int:member_id>/delete", GymMemberDeleteView.as_view(), name="gym-member-delete"),
+    path("gyms/<uuid:gym_id>/members/<int:member_id>/renew/", MemberRenewView.as_view(), name="gym-member-renew"),
 
     path("gyms/<uuid:gym_id>/members/<int:member_id>/payments/", MemberPaymentListCreateView.as_view(), name="member-payments"),
+    path("gyms/<uuid:gym_id>/payments/", GymPaymentListView.as_view(), name="gym-payments"),
+    path("gyms/<uuid:gym_id>/payments/bulk/", BulkPaymentCreateView.as_view(), name="payments-bulk-create"),
+    path("gyms/<uuid:gym_id>/payments/export.csv", PaymentExportView.as_view(), {"fmt": "csv"}, name="payments-export-csv"),
+    path("gyms/<uuid:gym_id>/payments/export.ndjson", PaymentExportView.as_view(), {"fmt": "ndjson"}, name="payments-export-ndjson"),
     path("gyms/<uuid:gym_id>/dashboard/revenue-summary/", RevenueSummaryView.as_view(), name="revenue-summary"),
+    path("gyms/<uuid:gym_id>/dashboard/revenue-series/", RevenueSeriesView.as_view(), name="revenue-series"),
     path("gyms/<uuid:gym_id>/members/<int:member_id>/whatsapp-reminder/", MemberWhatsappReminderView.as_view(), name="member-whatsapp-reminder"),
+    path("gyms/<uuid:gym_id>/reminders/whatsapp/", WhatsappReminderListView.as_view(), name="whatsapp-reminders"),
     path("gyms/<uuid:gym_id>/payments/<int:payment_id>/receipt/", PaymentReceiptView.as_view(), name="payment-receipt"),
 ]
\ No newline at end of file
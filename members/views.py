@@ -1,50 +1,197 @@
-from rest_framework.generics import ListCreateAPIView,ListAPIView,RetrieveUpdateAPIView,RetrieveDestroyAPIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import NotFound
 from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+from urllib.parse import quote
+
+from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper, Q
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
 from django.utils import timezone
-from .models import Member
-from .serializers import MemberSerializer
-from gym.models import Gym
-from rest_framework.filters import SearchFilter, OrderingFilter
-from billing.permission import HasActiveSubscription
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework import status
 from rest_framework.generics import (
     ListCreateAPIView,
     ListAPIView,
     RetrieveUpdateAPIView,
     RetrieveDestroyAPIView,
-    CreateAPIView
 )
-from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound, ValidationError
-from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper, Q
-from .models import Member, Payment
-from .serializers import MemberSerializer, PaymentSerializer, PaymentCreateSerializer
+from rest_framework.views import APIView
+
+from billing.permission import HasActiveSubscription
+from gym.caching import generation_cached
+from .bulk import BULK_PAYMENT_MAX_ROWS, import_members, import_payments, read_csv_rows, read_upload_rows
+from .filters import MemberBalanceFilter, MemberOrderingFilter
+from .exports import IgnoreClientContentNegotiation, stream_export
+from .mixins import GymScopedMixin
+from .models import GymDailyRevenue, Member, Payment
+from .pagination import KeysetCursorPagination, PaymentCursorPagination
+from .renewals import BULK_RENEWAL_MAX_ROWS, renew_members
+from .search import DEFAULT_LIMIT, MAX_LIMIT, search_members
+from .serializers import (
+    MemberSerializer,
+    MembershipRenewalSerializer,
+    PaymentSerializer,
+    PaymentCreateSerializer,
+    WhatsappReminderSerializer,
+)
 
 
-class GymMemberListCreateView(ListCreateAPIView):
+# Everything PaymentSerializer reads, including the joined member's balance.
+PAYMENT_LIST_FIELDS = (
+    "id",
+    "member_id",
+    "gym_id",
+    "amount",
+    "payment_date",
+    "note",
+    "receipt_number",
+    "created_at",
+    "member__name",
+    "member__total_fee",
+    "member__amount_paid",
+)
+
+
+# Everything WhatsappReminderSerializer and the reminder templates read.
+REMINDER_FIELDS = (
+    "id",
+    "name",
+    "phone",
+    "phone_digits",
+    "end_date",
+    "payment_status",
+    "total_fee",
+    "amount_paid",
+)
+
+
+def parse_date_param(params, name, default=None):
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Use YYYY-MM-DD."})
+    return parsed
+
+
+def parse_days_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: "Must be a whole number of days."})
+
+
+# The query builders below are shared with members.async_views.
+
+def expiring_members(gym, days):
+    """Active members whose membership ends within `days`."""
+    today = timezone.localdate()
+    return (
+        Member.objects
+        .filter(gym=gym, is_active=True, end_date__gte=today, end_date__lte=today + timedelta(days=days))
+        .with_balances()
+        .order_by("end_date")
+    )
+
+
+def gym_payments(gym, params):
+    payments = Payment.objects.filter(gym=gym)
+
+    start = parse_date_param(params, "start")
+    end = parse_date_param(params, "end")
+    if start:
+        payments = payments.filter(payment_date__gte=start)
+    if end:
+        payments = payments.filter(payment_date__lte=end)
+
+    if params.get("member"):
+        if not params["member"].isdigit():
+            raise ValidationError({"member": "Must be a member id."})
+        payments = payments.filter(member_id=params["member"])
+
+    return payments.select_related("member").only(*PAYMENT_LIST_FIELDS)
+
+
+def revenue_summary_aggregates():
+    """One pass over a gym's active members for every live number."""
+    pending_expr = ExpressionWrapper(
+        F("total_fee") - F("amount_paid"),
+        output_field=DecimalField(max_digits=10, decimal_places=2)
+    )
+    return {
+        "total_expected": Sum("total_fee"),
+        "total_collected": Sum("amount_paid"),
+        "total_pending": Sum(pending_expr),
+        "total_students": Count("id"),
+        "pending_students": Count(
+            "id",
+            filter=Q(payment_status__in=[Member.PaymentStatus.PENDING, Member.PaymentStatus.PARTIAL]),
+        ),
+    }
+
+
+def revenue_summary_data(totals):
+    return {
+        "total_expected_revenue": totals["total_expected"] or 0,
+        "total_collected": totals["total_collected"] or 0,
+        "total_pending": totals["total_pending"] or 0,
+        "total_students": totals["total_students"] or 0,
+        "pending_students": totals["pending_students"] or 0,
+    }
+
+
+def receipt_payments(kwargs, user):
+    """The receipt's payment, joined to its member and gym, scoped to the owner."""
+    return (
+        Payment.objects
+        .select_related("member", "gym")
+        .filter(
+            id=kwargs["payment_id"],
+            gym_id=kwargs["gym_id"],
+            gym__owner=user,
+        )
+    )
+
+
+def receipt_data(payment):
+    member = payment.member
+    return {
+        "receipt_number": payment.receipt_number,
+        "business_name": payment.gym.name,
+        "student_name": member.name,
+        "phone": member.phone,
+        "payment_date": payment.payment_date,
+        "total_fee": member.total_fee,
+        "paid_this_time": payment.amount,
+        "total_paid": member.amount_paid,
+        "remaining_balance": member.remaining_fee,
+        "note": payment.note,
+    }
+
+
+
+class GymMemberListCreateView(GymScopedMixin, ListCreateAPIView):
     permission_classes = [IsAuthenticated, HasActiveSubscription]
     serializer_class = MemberSerializer
+    pagination_class = KeysetCursorPagination
 
 
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [SearchFilter, MemberBalanceFilter, MemberOrderingFilter]
     search_fields = ["name", "phone", "course_taken", "offer_taken"]
-    ordering_fields = ["end_date", "name", "created_at"]
+    ordering_fields = ["end_date", "name", "created_at", "days_left", "remaining_fee"]
     ordering = ["end_date"]
 
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
-
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
-
     def get_queryset(self):
         gym = self.get_gym()
-        return Member.objects.filter(gym=gym, is_active=True).order_by("end_date")
+        return Member.objects.filter(gym=gym, is_active=True).with_balances().order_by("end_date")
 
     def perform_create(self, serializer):
         gym = self.get_gym()
@@ -55,58 +202,79 @@ class GymMemberListCreateView(ListCreateAPIView):
 
 
 
-class ExpiringMembersView(ListAPIView):
-    permission_classes = [IsAuthenticated, HasActiveSubscription]
-    serializer_class = MemberSerializer
-
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
-
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
-    
+class MemberSearchView(GymScopedMixin, APIView):
+    """
+    Ranked typeahead for check-in: ?q=<name or phone digits>&limit=20.
 
+    Exact matches first, then name prefixes / phone suffixes, then word
+    starts, then substrings.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
 
-    def get_queryset(self):
+    def get(self, request, *args, **kwargs):
         gym = self.get_gym()
+        try:
+            limit = min(int(request.query_params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            raise ValidationError({"limit": "Must be a whole number."})
+        if limit < 1:
+            raise ValidationError({"limit": "Must be at least 1."})
+
+        queryset = Member.objects.filter(gym=gym, is_active=True).with_balances()
+        members = search_members(queryset, request.query_params.get("q", ""), limit=limit)
+        return Response(MemberSerializer(members, many=True).data)
+
+
+class MemberImportView(GymScopedMixin, APIView):
+    """
+    Onboard many members at once: a CSV/XLSX upload (multipart field "file")
+    with MemberSerializer's columns, or a JSON array of member objects.
+
+    The file is streamed in batches, so a 20k-row spreadsheet never sits in
+    memory. Valid rows are created; invalid ones are reported per row.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    parser_classes = [JSONParser, MultiPartParser]
 
+    def post(self, request, *args, **kwargs):
+        gym = self.get_gym()
 
-        days = int(self.request.query_params.get("days", 7))
-
+        upload = request.FILES.get("file")
+        if upload is not None:
+            rows = read_upload_rows(upload)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            raise ValidationError("Send a CSV/XLSX file or a JSON array of members.")
 
+        created, errors, error_count = import_members(gym, rows)
 
-        today = timezone.localdate()
-        expiry_limit = today + timedelta(days=days)
-        
+        return Response(
+            {"created": created, "error_count": error_count, "errors": errors},
+            status=status.HTTP_201_CREATED if created or not error_count else status.HTTP_400_BAD_REQUEST,
+        )
 
-        
-        return Member.objects.filter(
-            gym=gym,
-            is_active=True,
-            end_date__gte=today,
-            end_date__lte=expiry_limit,
-        ).order_by("end_date")
 
+class ExpiringMembersView(GymScopedMixin, ListAPIView):
+    """Active members whose membership ends within ?days= (default 7)."""
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    serializer_class = MemberSerializer
+    pagination_class = KeysetCursorPagination
 
+    @generation_cached()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
+    def get_queryset(self):
+        gym = self.get_gym()
+        return expiring_members(gym, parse_days_param(self.request.query_params, "days", 7))
 
 
-class GymMemberDetailView(RetrieveUpdateAPIView):
+class GymMemberDetailView(GymScopedMixin, RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated, HasActiveSubscription]
     serializer_class = MemberSerializer
     lookup_url_kwarg = "member_id"  
-
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
-
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
+    member_active_only = False
 
     def get_queryset(self):
         gym = self.get_gym()
@@ -114,19 +282,11 @@ class GymMemberDetailView(RetrieveUpdateAPIView):
 
 
 
-class GymMemberDeleteView(RetrieveDestroyAPIView):
+class GymMemberDeleteView(GymScopedMixin, RetrieveDestroyAPIView):
     permission_classes = [IsAuthenticated, HasActiveSubscription]
     serializer_class = MemberSerializer
     lookup_url_kwarg = "member_id"
-
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
-
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
+    member_active_only = False
 
     def get_queryset(self):
         gym = self.get_gym()
@@ -135,30 +295,81 @@ class GymMemberDeleteView(RetrieveDestroyAPIView):
 
 
 
-class MemberPaymentListCreateView(ListCreateAPIView):
+class MemberRenewView(GymScopedMixin, APIView):
+    """
+    Renew one member: {plan?, fee?, amount?, payment_date?, note?}.
+
+    See members.renewals for how the new period and fee are worked out.
+    Passing `amount` records a payment against the new period.
+    """
     permission_classes = [IsAuthenticated, HasActiveSubscription]
+    # Lapsed (inactive) members are exactly the ones who come back to renew.
+    member_active_only = False
+
+    def post(self, request, *args, **kwargs):
+        member = self.get_member()
+        if not isinstance(request.data, dict):
+            raise ValidationError("Send a JSON object.")
+
+        renewals, errors = renew_members(member.gym, [{**request.data, "member_id": member.id}])
+        if errors:
+            raise ValidationError(errors[0]["errors"])
+
+        renewal, = renewals
+        return Response(
+            {
+                "member": MemberSerializer(renewal.member).data,
+                "renewal": MembershipRenewalSerializer(renewal).data,
+            },
+            status=status.HTTP_201_CREATED,
+        )
 
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
 
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
+class BulkMemberRenewView(GymScopedMixin, APIView):
+    """
+    Renew many members at once, e.g. a month-start run.
 
-    def get_member(self):
+    Accepts a JSON array of {member_id, plan?, fee?, amount?, payment_date?,
+    note?}, or {"member_ids": [...], ...} to apply the same fields to every
+    member. Invalid rows come back in "errors" with their 0-based index.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+
+    def get_rows(self):
+        data = self.request.data
+        if isinstance(data, dict) and isinstance(data.get("member_ids"), list):
+            shared = {key: value for key, value in data.items() if key != "member_ids"}
+            rows = [{**shared, "member_id": member_id} for member_id in data["member_ids"]]
+        elif isinstance(data, list):
+            rows = data
+        else:
+            raise ValidationError("Send a JSON array of renewals or an object with member_ids.")
+
+        if len(rows) > BULK_RENEWAL_MAX_ROWS:
+            raise ValidationError(f"At most {BULK_RENEWAL_MAX_ROWS} renewals per request.")
+        return rows
+
+    def post(self, request, *args, **kwargs):
         gym = self.get_gym()
-        member_id = self.kwargs["member_id"]
+        renewals, errors = renew_members(gym, self.get_rows())
+
+        return Response(
+            {
+                "renewed": len(renewals),
+                "renewals": MembershipRenewalSerializer(renewals, many=True).data,
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED if renewals or not errors else status.HTTP_400_BAD_REQUEST,
+        )
 
-        member = Member.objects.filter(gym=gym, id=member_id, is_active=True).first()
-        if not member:
-            raise NotFound("Member not found.")
-        return member
+
+class MemberPaymentListCreateView(GymScopedMixin, ListCreateAPIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
 
     def get_queryset(self):
         member = self.get_member()
-        return Payment.objects.filter(member=member, gym=member.gym).order_by("-payment_date", "-id")
+        payments = Payment.objects.filter(member=member, gym=member.gym).order_by("-payment_date", "-id")
+        return payments.select_related("member").only(*PAYMENT_LIST_FIELDS)
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -172,48 +383,119 @@ class MemberPaymentListCreateView(ListCreateAPIView):
     
 
 
-class RevenueSummaryView(APIView):
+class GymPaymentListView(GymScopedMixin, ListAPIView):
+    """
+    Gym-wide payment ledger, newest first.
+
+    Filters: ?start=YYYY-MM-DD&end=YYYY-MM-DD on payment_date, ?member=<id>.
+    The student name and balance come from one joined query, so a page costs
+    the same number of queries whatever its size.
+    """
     permission_classes = [IsAuthenticated, HasActiveSubscription]
+    serializer_class = PaymentSerializer
+    pagination_class = PaymentCursorPagination
+
+    def get_queryset(self):
+        return gym_payments(self.get_gym(), self.request.query_params)
 
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
 
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
+class BulkPaymentCreateView(GymScopedMixin, APIView):
+    """
+    Record many payments at once.
 
+    Accepts a JSON array of {member_id, amount, payment_date?, note?}, or a CSV
+    upload (multipart field "file") with the same columns. Valid rows are
+    written; invalid ones come back in "errors" with their 0-based row index.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    parser_classes = [JSONParser, MultiPartParser]
+
+    def get_rows(self):
+        upload = self.request.FILES.get("file")
+        if upload is not None:
+            rows = read_csv_rows(upload)
+        elif isinstance(self.request.data, list):
+            rows = self.request.data
+        else:
+            raise ValidationError("Send a JSON array of payments or a CSV file.")
+
+        rows = list(islice(rows, BULK_PAYMENT_MAX_ROWS + 1))
+        if len(rows) > BULK_PAYMENT_MAX_ROWS:
+            raise ValidationError(f"At most {BULK_PAYMENT_MAX_ROWS} payments per request.")
+        return rows
+
+    def post(self, request, *args, **kwargs):
+        gym = self.get_gym()
+        rows = self.get_rows()
+        payments, errors = import_payments(gym, rows)
+
+        return Response(
+            {
+                "created": len(payments),
+                "payments": [
+                    {
+                        "id": payment.id,
+                        "member": payment.member_id,
+                        "amount": payment.amount,
+                        "payment_date": payment.payment_date,
+                        "receipt_number": payment.receipt_number,
+                    }
+                    for payment in payments
+                ],
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED if payments or not errors else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class RevenueSummaryView(GymScopedMixin, APIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+
+    @generation_cached()
     def get(self, request, *args, **kwargs):
         gym = self.get_gym()
-        members = Member.objects.filter(gym=gym, is_active=True)
+        totals = Member.objects.filter(gym=gym, is_active=True).aggregate(**revenue_summary_aggregates())
+        return Response(revenue_summary_data(totals))
 
-        totals = members.aggregate(
-            total_expected=Sum("total_fee"),
-            total_collected=Sum("amount_paid"),
-            total_students=Count("id"),
-        )
 
-        pending_expr = ExpressionWrapper(
-            F("total_fee") - F("amount_paid"),
-            output_field=DecimalField(max_digits=10, decimal_places=2)
-        )
+class RevenueSeriesView(GymScopedMixin, APIView):
+    """
+    Collected revenue per day/week/month, read from the GymDailyRevenue rollup.
 
-        total_pending = members.aggregate(
-            total_pending=Sum(pending_expr)
-        )["total_pending"] or 0
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: last 30 days), ?group=day|week|month
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
 
-        pending_students = members.filter(
-            Q(payment_status=Member.PaymentStatus.PENDING) |
-            Q(payment_status=Member.PaymentStatus.PARTIAL)
-        ).count()
+    truncators = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+
+    def get(self, request, *args, **kwargs):
+        gym = self.get_gym()
+
+        end = parse_date_param(request.query_params, "end", timezone.localdate())
+        start = parse_date_param(request.query_params, "start", end - timedelta(days=29))
+        if start > end:
+            raise ValidationError("start must be on or before end.")
+
+        group = request.query_params.get("group", "day")
+        if group not in self.truncators:
+            raise ValidationError({"group": f"Choose one of: {', '.join(self.truncators)}."})
+
+        rows = (
+            GymDailyRevenue.objects
+            .filter(gym=gym, date__gte=start, date__lte=end)
+            .annotate(period=self.truncators[group]("date"))
+            .values("period")
+            .annotate(collected=Sum("collected"), payments_count=Sum("payments_count"))
+            .order_by("period")
+        )
+        results = list(rows)
 
         return Response({
-            "total_expected_revenue": totals["total_expected"] or 0,
-            "total_collected": totals["total_collected"] or 0,
-            "total_pending": total_pending,
-            "total_students": totals["total_students"] or 0,
-            "pending_students": pending_students,
+            "start": start,
+            "end": end,
+            "group": group,
+            "total_collected": sum((row["collected"] for row in results), Decimal("0.00")),
+            "results": results,
         })
 
 
@@ -221,29 +503,82 @@ class RevenueSummaryView(APIView):
 
 
 
-from urllib.parse import quote
-
+class MemberExportView(GymScopedMixin, APIView):
+    """
+    GET members/export.csv | members/export.ndjson
 
-class MemberWhatsappReminderView(APIView):
+    Active members only unless ?include_inactive=1.
+    """
     permission_classes = [IsAuthenticated, HasActiveSubscription]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    columns = {
+        "id": "id",
+        "name": "name",
+        "phone": "phone",
+        "plan": "plan",
+        "start_date": "start_date",
+        "end_date": "end_date",
+        "course_taken": "course_taken",
+        "offer_taken": "offer_taken",
+        "total_fee": "total_fee",
+        "amount_paid": "amount_paid",
+        "payment_status": "payment_status",
+        "last_payment_date": "last_payment_date",
+        "is_active": "is_active",
+        "created_at": "created_at",
+    }
 
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
+    def get(self, request, *args, **kwargs):
+        gym = self.get_gym()
 
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
+        members = Member.objects.filter(gym=gym).order_by("end_date", "id")
+        if request.query_params.get("include_inactive") != "1":
+            members = members.filter(is_active=True)
 
-    def get_member(self):
+        return stream_export(members, self.columns, kwargs["fmt"], f"members-{gym.id}")
+
+
+class PaymentExportView(GymScopedMixin, APIView):
+    """
+    GET payments/export.csv | payments/export.ndjson
+
+    Optional ?start=YYYY-MM-DD&end=YYYY-MM-DD on payment_date.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    columns = {
+        "id": "id",
+        "receipt_number": "receipt_number",
+        "member_id": "member_id",
+        "student_name": "member__name",
+        "amount": "amount",
+        "payment_date": "payment_date",
+        "note": "note",
+        "created_at": "created_at",
+    }
+
+    def get(self, request, *args, **kwargs):
         gym = self.get_gym()
-        member_id = self.kwargs["member_id"]
 
-        member = Member.objects.filter(gym=gym, id=member_id, is_active=True).first()
-        if not member:
-            raise NotFound("Member not found.")
-        return member
+        payments = Payment.objects.filter(gym=gym).order_by("payment_date", "id")
+        start = parse_date_param(request.query_params, "start")
+        end = parse_date_param(request.query_params, "end")
+        if start:
+            payments = payments.filter(payment_date__gte=start)
+        if end:
+            payments = payments.filter(payment_date__lte=end)
+
+        return stream_export(payments, self.columns, kwargs["fmt"], f"payments-{gym.id}")
+
+
+
+
+
+
+class MemberWhatsappReminderView(GymScopedMixin, APIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
 
     def get(self, request, *args, **kwargs):
         member = self.get_member()
@@ -270,50 +605,53 @@ class MemberWhatsappReminderView(APIView):
             "remaining_fee": member.remaining_fee,
             "payment_status": member.payment_status,
         })
-    
 
 
+class WhatsappReminderListView(GymScopedMixin, ListAPIView):
+    """
+    Reminders for a whole dues/renewal campaign in one indexed query:
+    ?status=pending,partial&expiring_within=7, keyset-paginated by end_date.
 
+    `status` defaults to pending,partial; `expiring_within` limits to members
+    whose membership ends within that many days from today.
+    """
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+    serializer_class = WhatsappReminderSerializer
+    pagination_class = KeysetCursorPagination
 
+    def get_queryset(self):
+        gym = self.get_gym()
+        params = self.request.query_params
 
+        statuses = [s for s in params.get("status", "pending,partial").split(",") if s]
+        unknown = set(statuses) - set(Member.PaymentStatus.values)
+        if unknown or not statuses:
+            raise ValidationError({"status": f"Use a comma-separated list of {', '.join(Member.PaymentStatus.values)}."})
 
-class PaymentReceiptView(APIView):
-    permission_classes = [IsAuthenticated, HasActiveSubscription]
+        queryset = Member.objects.filter(gym=gym, is_active=True, payment_status__in=statuses)
 
-    def get_gym(self):
-        gym_id = self.kwargs["gym_id"]
-        user = self.request.user
+        expiring_within = params.get("expiring_within")
+        if expiring_within:
+            try:
+                days = int(expiring_within)
+            except ValueError:
+                raise ValidationError({"expiring_within": "Must be a whole number of days."})
+            today = timezone.localdate()
+            queryset = queryset.filter(end_date__gte=today, end_date__lte=today + timedelta(days=days))
 
-        gym = Gym.objects.filter(id=gym_id, owner=user).first()
-        if not gym:
-            raise NotFound("Gym not found.")
-        return gym
+        return queryset.with_balances().only(*REMINDER_FIELDS)
 
-    def get_payment(self):
-        gym = self.get_gym()
-        payment_id = self.kwargs["payment_id"]
 
-        payment = Payment.objects.filter(gym=gym, id=payment_id).select_related("member", "gym").first()
+class PaymentReceiptView(GymScopedMixin, APIView):
+    permission_classes = [IsAuthenticated, HasActiveSubscription]
+
+    def get_payment(self):
+        payment = receipt_payments(self.kwargs, self.request.user).first()
         if not payment:
+            self.get_gym()
             raise NotFound("Payment not found.")
         return payment
 
+    @generation_cached()
     def get(self, request, *args, **kwargs):
-        payment = self.get_payment()
-        member = payment.member
-
-        return Response({
-            "receipt_number": payment.receipt_number,
-            "business_name": payment.gym.name,
-            "student_name": member.name,
-            "phone": member.phone,
-            "payment_date": payment.payment_date,
-            "total_fee": member.total_fee,
-            "paid_this_time": payment.amount,
-            "total_paid": member.amount_paid,
-            "remaining_balance": member.remaining_fee,
-            "note": payment.note,
-        })    
-
-
-  
\ No newline at end of file
+        return Response(receipt_data(self.get_payment()))
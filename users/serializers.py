@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from .tokens import EntitlementRefreshToken
 
 User = get_user_model()
 
@@ -33,9 +36,11 @@ class signupserializers(serializers.ModelSerializer):
 
 
         return user
-        
-
 
 
+class EntitlementTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = EntitlementRefreshToken
 
 
+class EntitlementTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = EntitlementRefreshToken
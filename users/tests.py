@@ -1,3 +1,94 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from billing.entitlements import clear_entitlement_cache, invalidate_entitlement, revoke_entitlement_claims
+from billing.models import SaaSPlan, OwnerSubscription
+from gym.models import Gym
+from .models import User
+
+
+# These tests log in for real; the default hasher alone makes that a "slow request".
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class EntitlementClaimTests(TestCase):
+    def setUp(self):
+        clear_entitlement_cache()
+        self.user = User.objects.create_user(username="owner@example.com", password="secret123")
+        plan = SaaSPlan.objects.create(name="Pro", interval="monthly", amount_inr=499, razorpay_plan_id="plan_pro")
+        self.sub = OwnerSubscription.objects.create(
+            owner=self.user,
+            plan=plan,
+            status=OwnerSubscription.Status.ACTIVE,
+            current_end=timezone.now() + timedelta(days=30),
+        )
+        self.gym = Gym.objects.create(owner=self.user, name="Iron Temple")
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            reverse("login"), {"username": "owner@example.com", "password": "secret123"}, format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def authenticate(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def revoke_access(self):
+        self.sub.status = OwnerSubscription.Status.HALTED
+        self.sub.current_end = timezone.now() - timedelta(seconds=5)
+        self.sub.save()
+        invalidate_entitlement(self.user.id)
+
+    def summary_url(self):
+        return reverse("revenue-summary", kwargs={"gym_id": self.gym.id})
+
+    def test_login_embeds_entitlement_claims(self):
+        access = AccessToken(self.login()["access"])
+
+        self.assertEqual(access["sub_status"], OwnerSubscription.Status.ACTIVE)
+        self.assertEqual(access["access_until"], int(self.sub.current_end.timestamp()))
+        self.assertIn("ent_at", access)
+
+    def test_positive_claims_skip_the_subscription_lookup(self):
+        self.authenticate(self.login()["access"])
+        clear_entitlement_cache()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.summary_url())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any("billing_ownersubscription" in query["sql"] for query in queries))
+
+    def test_revocation_distrusts_claims_already_issued(self):
+        self.authenticate(self.login()["access"])
+        self.revoke_access()
+        revoke_entitlement_claims(self.user.id)
+
+        response = self.client.get(self.summary_url())
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_refresh_recomputes_claims(self):
+        tokens = self.login()
+        self.revoke_access()
+
+        response = self.client.post(reverse("refresh"), {"refresh": tokens["refresh"]}, format="json")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        access = AccessToken(response.data["access"])
+        self.assertIsNone(access["sub_status"])
+        self.assertIsNone(access["access_until"])
+
+    def test_token_without_claims_falls_back_to_the_database(self):
+        self.authenticate(str(AccessToken.for_user(self.user)))
+
+        self.assertEqual(self.client.get(self.summary_url()).status_code, 200)
+        self.revoke_access()
+        self.assertEqual(self.client.get(self.summary_url()).status_code, 403)
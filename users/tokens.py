@@ -0,0 +1,27 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from billing.entitlements import entitlement_claims
+
+
+ENTITLEMENT_CLAIMS = ("sub_status", "access_until", "ent_at")
+
+
+class EntitlementRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the owner's subscription
+    entitlement, so HasActiveSubscription can authorize from the token alone.
+
+    Claims are recomputed every time an access token is minted (login and
+    refresh) rather than copied from the long-lived refresh token.
+    """
+
+    no_copy_claims = RefreshToken.no_copy_claims + ENTITLEMENT_CLAIMS
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user_id = self.payload[api_settings.USER_ID_CLAIM]
+        for claim, value in entitlement_claims(user_id).items():
+            access[claim] = value
+        return access
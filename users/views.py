@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny,IsAuthenticated
+from billing.entitlements import get_entitlement
 from billing.models import OwnerSubscription
 from django.utils import timezone
 from .serializers import signupserializers
@@ -53,14 +54,11 @@ class SubscriptionStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        sub = (
-            OwnerSubscription.objects
-            .filter(owner=request.user)
-            .order_by("-created_at")
-            .first()
-        )
+        # Same cached entitlement HasActiveSubscription uses, so the SPA and
+        # the API never disagree about access.
+        entitlement = get_entitlement(request.user.id)
 
-        if not sub:
+        if entitlement.status is None:
             return Response({
                 "status": "none",
                 "is_active": False,
@@ -72,37 +70,26 @@ class SubscriptionStatusView(APIView):
         now = timezone.now()
         days_remaining = 0
 
-        if sub.current_end:
-            delta = sub.current_end - now
+        if entitlement.current_end:
+            delta = entitlement.current_end - now
             days_remaining = max(delta.days, 0)
 
-        has_access = False
+        has_access = entitlement.has_access(now)
         message = "Subscription inactive. Please subscribe to continue."
 
-        if sub.status == OwnerSubscription.Status.ACTIVE:
-            has_access = True
+        if has_access and entitlement.status == OwnerSubscription.Status.ACTIVE:
             message = "Subscription is active."
 
-        elif (
-            sub.status == OwnerSubscription.Status.CANCELLED
-            and sub.current_end
-            and sub.current_end > now
-        ):
-            has_access = True
-            message = f"Auto-renew cancelled. Access is active until {sub.current_end}."
-
-        elif (
-            sub.status in [OwnerSubscription.Status.HALTED, OwnerSubscription.Status.PAUSED]
-            and sub.current_end
-            and sub.current_end > now
-        ):
-            has_access = True
-            message = f"Subscription is paused/ halted, but access remains active until {sub.current_end}."
+        elif has_access and entitlement.status == OwnerSubscription.Status.CANCELLED:
+            message = f"Auto-renew cancelled. Access is active until {entitlement.current_end}."
+
+        elif has_access and entitlement.status == OwnerSubscription.Status.HALTED:
+            message = f"Subscription is paused/ halted, but access remains active until {entitlement.current_end}."
 
         return Response({
-            "status": sub.status,
+            "status": entitlement.status,
             "is_active": has_access,
-            "current_end": sub.current_end,
+            "current_end": entitlement.current_end,
             "days_remaining": days_remaining,
             "message": message,
-        })
\ No newline at end of file
+        })